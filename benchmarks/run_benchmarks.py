@@ -0,0 +1,271 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import itertools
+import argparse
+import tempfile
+import platform
+import tracemalloc
+import contextlib
+from typing import Callable, List, Dict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.data.ingestion import load_snapshot
+from src.data.preprocessor import json_to_df, preprocess_df
+from src.data.statistics import smart_statistics
+from src.generator.interactive_report import generate_interactive_report
+from src.generator.report_generator import generate_html_report, generate_sharded_html_report
+from src.model.mock_llm import MockBackend, MockConfig
+from src.model.prompt_engine_openai import parse_response, process_objectives_and_update_df
+from src.model.stream_parser import StreamingJsonParser, StreamingResponseParser
+from src.model.structured_output import parse_evaluation
+
+DEFAULT_SIZES = [1000, 10000, 50000, 200000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+# The engine and the HTML report are far slower per row, cap their dataset size
+STAGE_MAX_SIZE = {"engine_mock": 20000, "html_report": 50000, "html_report_incremental": 50000}
+
+CAREERS = [f"Carrera {i}" for i in range(40)]
+VERDICTS = ["Sí", "Parcialmente", "No"]
+OBJECTIVE_WORDS = (
+    "el estudiante será capaz de analizar diseñar implementar evaluar sistemas modelos "
+    "procesos datos resultados métodos herramientas proyectos al finalizar la asignatura"
+).split()
+
+# Synthetic data generators, seeded so every run sees the same input
+
+def make_objective(rng: random.Random) -> str:
+    lines = [" ".join(rng.choices(OBJECTIVE_WORDS, k=rng.randint(8, 40))) for _ in range(rng.randint(1, 4))]
+    return "\n- ".join(lines)
+
+def make_raw_records(n_courses: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    records = []
+    for i in range(n_courses):
+        code = f"MAT-{i:06d}"
+        parent = rng.choice(CAREERS)
+        common = {
+            'codigo_materia': code,
+            'nombre_materia': f"Materia {i}",
+            'electiva': rng.choice(["Si", "No"]),
+            'objectivo_materias': make_objective(rng),
+        }
+        records.append({**common, 'carrera_servicio': "", 'carrera': parent})
+        for child in rng.sample(CAREERS, rng.randint(0, 3)):
+            records.append({**common, 'carrera_servicio': parent, 'carrera': child})
+    return records
+
+def make_block(code: str, rng: random.Random) -> str:
+    lines = [f"Código: {code}"]
+    for criterion in "SMART":
+        lines.append(f"{criterion}: {rng.choice(VERDICTS)}. Explicación detallada del criterio {criterion} para {code}.")
+    lines.append("Objetivo Mejorado: Al finalizar la asignatura, el estudiante podrá analizar sistemas.\n"
+                 "*Sugerencias para criterio Medible:*\n- Sugerencia 1\n- Sugerencia 2")
+    return "\n".join(lines)
+
+def make_response_text(n_courses: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n\n".join(make_block(f"MAT-{i:06d}", rng) for i in range(n_courses))
+
+# The same evaluations as make_response_text in the structured output format
+def make_response_json(n_courses: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    evaluations = []
+    for i in range(n_courses):
+        code = f"MAT-{i:06d}"
+        evaluations.append({
+            "Código": code,
+            **{criterion: {"veredicto": rng.choice(VERDICTS),
+                           "explicacion": f"Explicación detallada del criterio {criterion} para {code}."}
+               for criterion in "SMART"},
+            "Objetivo Mejorado": "Al finalizar la asignatura, el estudiante podrá analizar sistemas.\n"
+                                 "*Sugerencias para criterio Medible:*\n- Sugerencia 1\n- Sugerencia 2",
+        })
+    return json.dumps({"evaluaciones": evaluations}, ensure_ascii=False)
+
+def make_processed_df(n_courses: int, seed: int = 0) -> pd.DataFrame:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return pd.DataFrame(preprocess_df(json_to_df(make_raw_records(n_courses, seed))))
+
+def make_results_df(n_courses: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    df = make_processed_df(n_courses, seed)
+    for criterion in "SMART":
+        df[criterion] = [f"{rng.choice(VERDICTS)}. Explicación del criterio {criterion}." for _ in range(len(df))]
+    df["Objetivo Mejorado"] = [
+        "El objetivo es adecuado y no requiere mejoras." if rng.random() < 0.2 else
+        "Al finalizar la asignatura, el estudiante podrá analizar sistemas.\n*Sugerencias para criterio Medible:*\n- Sugerencia 1"
+        for _ in range(len(df))
+    ]
+    return df
+
+# Stage definitions: each returns a callable that runs the timed work on prepared input
+
+def stage_preprocess(n: int, workdir: str) -> Callable[[], None]:
+    records = make_raw_records(n)
+    return lambda: preprocess_df(json_to_df(records))
+
+def stage_ingest(n: int, workdir: str) -> Callable[[], None]:
+    snapshot_path = os.path.join(workdir, f"raw_{n}.json")
+    with open(snapshot_path, "w", encoding="utf-8") as f:
+        json.dump(make_raw_records(n), f, ensure_ascii=False)
+    return lambda: load_snapshot(snapshot_path)
+
+def stage_parse_response(n: int, workdir: str) -> Callable[[], None]:
+    text = make_response_text(n)
+
+    def run():
+        parser = StreamingResponseParser(parse_response, lambda parsed: True, max_bad_blocks=n)
+        parser.feed(text)
+        parser.close()
+    return run
+
+def stage_parse_response_json(n: int, workdir: str) -> Callable[[], None]:
+    text = make_response_json(n)
+
+    def run():
+        parser = StreamingJsonParser(parse_evaluation, lambda parsed: True, max_bad_blocks=n)
+        parser.feed(text)
+        parser.close()
+    return run
+
+def stage_engine_mock(n: int, workdir: str) -> Callable[[], None]:
+    df = make_processed_df(n)
+    config = MockConfig(latency_s=0, tokens_per_s=0)
+    return lambda: process_objectives_and_update_df(
+        df.copy(), use_cache=False, max_concurrency=16, backend=MockBackend(config=config)
+    )
+
+def stage_html_report(n: int, workdir: str) -> Callable[[], None]:
+    df = make_results_df(n)
+    return lambda: generate_html_report(df, reports_dir=os.path.join(workdir, "reports"), use_cache=False)
+
+# Warm fragment cache, then 1% of the evaluations change between runs
+def stage_html_report_incremental(n: int, workdir: str) -> Callable[[], None]:
+    df = make_results_df(n)
+    reports_dir = os.path.join(workdir, "reports")
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_html_report(df, reports_dir=reports_dir)
+    runs = itertools.count(1)
+
+    def run():
+        changed = df.sample(frac=0.01, random_state=next(runs)).index
+        df.loc[changed, "S"] = df.loc[changed, "S"] + " Revisado."
+        generate_html_report(df, reports_dir=reports_dir)
+    return run
+
+def stage_html_report_sharded(n: int, workdir: str) -> Callable[[], None]:
+    df = make_results_df(n)
+    return lambda: generate_sharded_html_report(df, reports_dir=os.path.join(workdir, "reports"))
+
+def stage_interactive_report(n: int, workdir: str) -> Callable[[], None]:
+    df = make_results_df(n)
+    return lambda: generate_interactive_report(df, reports_dir=os.path.join(workdir, "reports"))
+
+def stage_statistics(n: int, workdir: str) -> Callable[[], None]:
+    df = make_results_df(n)
+    return lambda: smart_statistics(df, os.path.join(workdir, f"stats_{n}.csv"),
+                                    os.path.join(workdir, f"child_stats_{n}.csv"))
+
+STAGES = {
+    "ingest": stage_ingest,
+    "preprocess": stage_preprocess,
+    "parse_response": stage_parse_response,
+    "parse_response_json": stage_parse_response_json,
+    "engine_mock": stage_engine_mock,
+    "html_report": stage_html_report,
+    "html_report_incremental": stage_html_report_incremental,
+    "html_report_sharded": stage_html_report_sharded,
+    "interactive_report": stage_interactive_report,
+    "statistics": stage_statistics,
+}
+
+# Best wall time over the repeats, then one extra run under tracemalloc for peak memory
+def measure(run: Callable[[], None], repeats: int) -> Dict:
+    times = []
+    for _ in range(repeats):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wall_time_s": round(min(times), 4), "peak_memory_mb": round(peak / 1024 / 1024, 2)}
+
+def run_benchmarks(sizes: List[int], stages: List[str], repeats: int) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        # Journal, cache and metrics files of the engine land in the temporary directory
+        os.chdir(workdir)
+        try:
+            for stage in stages:
+                for n in sizes:
+                    if n > STAGE_MAX_SIZE.get(stage, n):
+                        continue
+                    key = f"{stage}[{n}]"
+                    result = measure(STAGES[stage](n, workdir), repeats)
+                    results[key] = result
+                    print(f"{key:<28} {result['wall_time_s']:>10.4f} s {result['peak_memory_mb']:>10.2f} MB")
+        finally:
+            os.chdir(cwd)
+    return results
+
+# Stages slower than baseline * (1 + threshold); sub-10ms stages are too noisy to judge
+def find_regressions(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for key, result in results.items():
+        previous = baseline.get(key)
+        if previous is None or previous["wall_time_s"] < 0.01:
+            continue
+        limit = previous["wall_time_s"] * (1 + threshold)
+        if result["wall_time_s"] > limit:
+            regressions.append(
+                f"{key}: {result['wall_time_s']:.4f} s vs baseline {previous['wall_time_s']:.4f} s "
+                f"(+{result['wall_time_s'] / previous['wall_time_s'] - 1:.0%})"
+            )
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the SMART checker hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Synthetic catalogue sizes (courses)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown before failing, e.g. 0.25")
+    args = parser.parse_args()
+
+    # Without a baseline there is nothing to gate on, fail before spending time on the run
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline first")
+        sys.exit(1)
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeats)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "pandas": pd.__version__, "results": results}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        sys.exit(0)
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = find_regressions(results, baseline, args.threshold)
+    if regressions:
+        print("Regressions found:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions against baseline.")
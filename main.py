@@ -1,41 +1,217 @@
 import os
+import argparse
+import logging
 from dotenv import load_dotenv
 import pandas as pd
 import webbrowser
 
-from src.data.preprocessor import load_and_preprocess
-from src.model.prompt_engine_openai import process_objectives_and_update_df
-from src.generator.report_generator import generate_html_report
+import src.data.statistics as statistics_module
+import src.generator.report_generator as report_module
+import src.generator.interactive_report as interactive_module
+from src.data.ingestion import FETCH_SNAPSHOT_PATH, load_snapshot
+from src.data.preprocessor import fetch_json, json_to_df, preprocess_df
+from src.model.evaluation_cache import prompt_version
+from src.model.prompt_engine_openai import process_objectives_and_update_df, build_messages, LLM_BACKEND, MODEL, TEMPERATURE
+from src.generator.report_generator import generate_html_report, generate_sharded_html_report
+from src.generator.interactive_report import generate_interactive_report
 from src.data.statistics import smart_statistics
+from src.data.storage import load_frame, save_frame
+from src.data.sync import sync_results
+from src.data.sharding import (
+    MANIFEST_NAME, SHARD_BY, SHARD_DIR, SHARD_KEYS, load_manifest, merge_shards, shard_paths, shard_result_paths, split_shards
+)
+from src.pipeline import Pipeline, Stage, code_fingerprint, file_fingerprint
+
+STAGE_NAMES = ["fetch", "preprocess", "evaluate", "report", "stats", "export"]
 
 if __name__ == "__main__":
     load_dotenv()
 
+    parser = argparse.ArgumentParser(
+        description="SMART Objectives Checker",
+        epilog="Without stage names every stage runs, skipping those whose inputs did not change "
+               "since the last run. Named stages always run, e.g. 'python main.py report' restyles "
+               "the report without fetching or calling the model."
+    )
+    parser.add_argument("stages", nargs="*", metavar="stage",
+                        help=f"Only run these stages: {', '.join(STAGE_NAMES)}")
+    parser.add_argument("--force", action="store_true", help="Run every stage even if it is up to date")
+    parser.add_argument("--resume", action="store_true",
+                        help="Replay the checkpoint journal and only evaluate missing courses")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Evaluate through one OpenAI Batch API job: half the price and no rate limits, "
+                             "results within the completion window. An interrupted run resumes the same job")
+    parser.add_argument("--sync", action="store_true",
+                        help="Compare the catalogue with the previous final results and only evaluate added or "
+                             "modified courses, keeping the previous verdicts and writing a delta summary")
+    shard_mode = parser.add_mutually_exclusive_group()
+    shard_mode.add_argument("--shards", type=int, metavar="N",
+                            help="Fetch and preprocess, then split the processed data into N shards to evaluate "
+                                 "in separate processes or machines")
+    shard_mode.add_argument("--shard", type=int, metavar="I",
+                            help="Only evaluate shard I of the last split, with its own checkpoint and results")
+    shard_mode.add_argument("--merge-shards", action="store_true",
+                            help="Merge the results of every shard into the final results, then write the report "
+                                 "and statistics")
+    parser.add_argument("--shard-by", choices=SHARD_KEYS, default=SHARD_BY,
+                        help="'career' keeps each Carrera Padre in one shard, 'code' spreads courses by a hash "
+                             "of Codigo Materia")
+    parser.add_argument("--report-mode", choices=["single", "sharded", "interactive"], default=os.getenv("REPORT_MODE", "single"),
+                        help="'single' writes one HTML file, 'sharded' writes one page per career plus an index, "
+                             "'interactive' writes a JSON payload with a filterable, virtually scrolled viewer")
+    parser.add_argument("--child-stats", action="store_true",
+                        help="Also write the statistics broken down by each career a course serves")
+    parser.add_argument("--export-csv", action="store_true",
+                        help="Also export the processed data and final results as CSV")
+    args = parser.parse_args()
+    unknown = [stage for stage in args.stages if stage not in STAGE_NAMES]
+    if unknown:
+        parser.error(f"unknown stage(s) {', '.join(unknown)}, choose from {', '.join(STAGE_NAMES)}")
+    if (args.shards is not None or args.shard is not None) and args.stages:
+        parser.error("--shards and --shard choose their own stages, do not name any")
+    if args.shards is not None and args.shards < 1:
+        parser.error("--shards needs at least 1 shard")
+
+    # Set LOG_LEVEL=DEBUG to dump every prompt and raw model response
+    # Third-party clients (httpx, openai) stay at WARNING, their per-request INFO lines flood concurrent runs
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    logging.getLogger("src").setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
     RAW_CSV = os.getenv("RAW_CSV_PATH", "./data/datos_materias.csv")
+    # Intermediates are columnar (.parquet or .arrow), the CSV copies are only written with --export-csv
+    PROCESSED_PATH = os.getenv("PROCESSED_PATH", "./data/processed.parquet")
+    FINAL_RESULTS_PATH = os.getenv("FINAL_RESULTS_PATH", "./data/final_results.parquet")
     PROCESSED_CSV = os.getenv("PROCESSED_CSV_PATH", "./data/processed.csv")
     FINAL_RESULTS_CSV = os.getenv("FINAL_RESULTS_CSV_PATH", "./data/final_results.csv")
     ESTATISTICS_CSV = os.getenv("ESTATISTICS_CSV_PATH", "./data/estadisticas_por_carrera.csv")
+    ESTATISTICS_CHILD_CSV = os.getenv("ESTATISTICS_CHILD_CSV_PATH", "./data/estadisticas_por_carrera_hija.csv")
+
+    # 1. Fetch raw data from the endpoint
+    # The endpoint response is kept as a snapshot, so later stages can rerun without fetching
+    def fetch(pipeline):
+        print("Fetching raw data...")
+        pipeline.frames["fetch"] = fetch_json(FETCH_SNAPSHOT_PATH)
+
+    # 2. Preprocess
+    def preprocess(pipeline):
+        print("Preprocessing raw data...")
+        records = pipeline.frames.get("fetch") or load_snapshot(FETCH_SNAPSHOT_PATH)
+        processed_df = pd.DataFrame(preprocess_df(json_to_df(records)))
+        save_frame(processed_df, PROCESSED_PATH)
+        pipeline.frames["preprocess"] = processed_df
+
+    # 3. Evaluate with prompt engine
+    def evaluate(pipeline):
+        print("Evaluating objectives with model...")
+        processed_df = pipeline.frame("preprocess")
+        if args.sync and os.path.exists(FINAL_RESULTS_PATH):
+            # Only new or edited objectives reach the model, the rest keep their previous verdicts
+            objectives_df = sync_results(processed_df, load_frame(FINAL_RESULTS_PATH), lambda changed_df: (
+                process_objectives_and_update_df(changed_df, resume=args.resume, bulk=args.bulk)
+            ))
+            save_frame(objectives_df, FINAL_RESULTS_PATH)
+            print(f"Results saved to {FINAL_RESULTS_PATH}")
+            pipeline.frames["evaluate"] = objectives_df
+            return
+        # Progress is journaled after each batch, final results are saved once at the end
+        pipeline.frames["evaluate"] = process_objectives_and_update_df(
+            processed_df, save_path=FINAL_RESULTS_PATH, resume=args.resume, bulk=args.bulk
+        )
+
+    # 3b. Shard mode: split the processed data, evaluate one shard per process, merge the results
+    def split(pipeline):
+        split_shards(pipeline.frame("preprocess"), args.shards, args.shard_by, source=file_fingerprint([PROCESSED_PATH]))
 
-    # 1. Preprocess
-    print("Preprocessing raw data...")
-    processed_data = load_and_preprocess()
-    pd.DataFrame(processed_data).to_csv(PROCESSED_CSV, index=False)
+    def evaluate_shard(index):
+        manifest = load_manifest()
+        if not 0 <= index < manifest["count"]:
+            parser.error(f"shard {index} does not exist, the last split has {manifest['count']} shards (0 to {manifest['count'] - 1})")
+        paths = shard_paths(index)
+        print(f"Evaluating shard {index} of {manifest['count']} ({manifest['key']})...")
+        process_objectives_and_update_df(
+            load_frame(paths["processed"]), save_path=paths["results"], resume=args.resume, bulk=args.bulk,
+            checkpoint_path=paths["checkpoint"], metrics_path=paths["metrics"], batch_state_path=paths["batch_job"]
+        )
 
-    # 2. Evaluate with prompt engine
-    print("Evaluating objectives with model...")
-    df = pd.read_csv(PROCESSED_CSV)
-    # Pass save_path so progress is saved after each batch
-    df = process_objectives_and_update_df(df, save_path=FINAL_RESULTS_CSV)
+    def merge(pipeline):
+        print("Merging shard results...")
+        if load_manifest()["source"] != file_fingerprint([PROCESSED_PATH]):
+            raise RuntimeError(f"{PROCESSED_PATH} changed since the shards were split, split and evaluate them again")
+        objectives_df = merge_shards()
+        save_frame(objectives_df, FINAL_RESULTS_PATH)
+        save_frame(objectives_df, FINAL_RESULTS_CSV)
+        print(f"Results saved to {FINAL_RESULTS_PATH} and {FINAL_RESULTS_CSV}")
+        pipeline.frames["evaluate"] = objectives_df
+        return [FINAL_RESULTS_PATH, FINAL_RESULTS_CSV]
 
-    # 3. Generate report
-    print("Generating HTML report...")
-    objectives_df = pd.read_csv(FINAL_RESULTS_CSV)
-    report_path = generate_html_report(objectives_df)
+    if args.shard is not None:
+        # Runs outside the pipeline, so shard processes never write its state file concurrently
+        evaluate_shard(args.shard)
+        raise SystemExit(0)
 
-    # 4. Open report in browser
-    abs_report_path = os.path.abspath(report_path)
-    webbrowser.open(f"file://{abs_report_path}")
+    # 4. Generate report and open it in the browser
+    def report(pipeline):
+        print("Generating HTML report...")
+        objectives_df = pipeline.frame("evaluate")
+        if args.report_mode == "sharded":
+            report_path = generate_sharded_html_report(objectives_df)
+        elif args.report_mode == "interactive":
+            report_path = generate_interactive_report(objectives_df)
+        else:
+            report_path = generate_html_report(objectives_df)
+
+        abs_report_path = os.path.abspath(report_path)
+        webbrowser.open(f"file://{abs_report_path}")
+        return [report_path]
 
     # 5. Generate statistics by career
-    print("Generating statistics by career...")
-    smart_statistics(FINAL_RESULTS_CSV, ESTATISTICS_CSV)
+    def stats(pipeline):
+        print("Generating statistics by career...")
+        child_csv = ESTATISTICS_CHILD_CSV if args.child_stats else None
+        smart_statistics(pipeline.frame("evaluate"), ESTATISTICS_CSV, child_csv)
+        return [ESTATISTICS_CSV] + ([child_csv] if child_csv else [])
+
+    # 6. Optional CSV copies of the intermediates
+    def export(pipeline):
+        save_frame(pipeline.frame("preprocess"), PROCESSED_CSV)
+        save_frame(pipeline.frame("evaluate"), FINAL_RESULTS_CSV)
+        print(f"CSV exports saved in {PROCESSED_CSV} and {FINAL_RESULTS_CSV}")
+
+    evaluate_params = {
+        "backend": LLM_BACKEND,
+        "model": MODEL,
+        "temperature": TEMPERATURE,
+        "prompt": prompt_version(build_messages([])[0]["content"]),
+    }
+    if args.merge_shards:
+        # The merge takes the evaluate stage's place; it reruns whenever a shard's results change
+        evaluate_stage = Stage("evaluate", merge, inputs=["preprocess"], outputs=[FINAL_RESULTS_PATH, FINAL_RESULTS_CSV],
+                               params={**evaluate_params, "shards": file_fingerprint(shard_result_paths())})
+    else:
+        evaluate_stage = Stage("evaluate", evaluate, inputs=["preprocess"], outputs=[FINAL_RESULTS_PATH], params=evaluate_params)
+
+    stages = [
+        Stage("fetch", fetch, outputs=[FETCH_SNAPSHOT_PATH], volatile=True),
+        Stage("preprocess", preprocess, inputs=["fetch"], outputs=[PROCESSED_PATH]),
+        evaluate_stage,
+        Stage("report", report, inputs=["evaluate"], params={
+            "mode": args.report_mode,
+            "code": code_fingerprint(report_module, interactive_module),
+        }),
+        Stage("stats", stats, inputs=["evaluate"], params={
+            "child_stats": args.child_stats,
+            "code": code_fingerprint(statistics_module),
+        }),
+    ]
+    if args.export_csv or "export" in args.stages:
+        stages.append(Stage("export", export, inputs=["preprocess", "evaluate"], outputs=[PROCESSED_CSV, FINAL_RESULTS_CSV]))
+
+    if args.shards is not None:
+        # Stop after the split, the shards are evaluated with --shard and combined with --merge-shards
+        stages = stages[:2] + [Stage("split", split, inputs=["preprocess"], outputs=[os.path.join(SHARD_DIR, MANIFEST_NAME)],
+                                     params={"shards": args.shards, "by": args.shard_by})]
+    elif args.merge_shards:
+        # fetch and preprocess already ran before the split, fetching again would only invalidate it
+        stages = stages[2:]
+
+    Pipeline(stages).run(selected=args.stages, force=args.force)
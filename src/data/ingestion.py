@@ -0,0 +1,219 @@
+import os
+import json
+import codecs
+import hashlib
+from typing import Iterable, Iterator, List, Dict, Optional
+from dotenv import load_dotenv
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Load environment variables
+load_dotenv()
+FETCH_CONNECT_TIMEOUT_S = float(os.getenv("FETCH_CONNECT_TIMEOUT_S", 10))
+FETCH_READ_TIMEOUT_S = float(os.getenv("FETCH_READ_TIMEOUT_S", 120))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", 5))
+FETCH_BACKOFF_S = float(os.getenv("FETCH_BACKOFF_S", 1.0))
+FETCH_VERIFY_TLS = os.getenv("FETCH_VERIFY_TLS", "false").lower() in ("1", "true", "yes")
+FETCH_SNAPSHOT_PATH = os.getenv("FETCH_SNAPSHOT_PATH", "./data/raw.json")
+
+CHUNK_SIZE = 1 << 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+
+# One pooled session per process; urllib3 retries connection errors and the
+# statuses above with exponential backoff and honours Retry-After
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=FETCH_RETRIES,
+            backoff_factor=FETCH_BACKOFF_S,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=4)
+        _session = requests.Session()
+        _session.mount("http://", adapter)
+        _session.mount("https://", adapter)
+    return _session
+
+# Items of a top-level JSON array, decoded one at a time as text chunks arrive,
+# so the raw payload is never held in memory as a whole. Payloads whose top
+# level is not an array are decoded in one go once complete.
+def iter_json_array(chunks: Iterable[str]) -> Iterator:
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer = ""
+    position = 0
+    exhausted = False
+
+    def read_more() -> bool:
+        nonlocal buffer, position, exhausted
+        for chunk in chunks:
+            if chunk:
+                buffer = buffer[position:] + chunk
+                position = 0
+                return True
+        exhausted = True
+        return False
+
+    def skip_whitespace() -> None:
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            if position < len(buffer) or not read_more():
+                return
+
+    skip_whitespace()
+    if position < len(buffer) and buffer[position] == "\ufeff":
+        position += 1
+        skip_whitespace()
+    if position >= len(buffer):
+        raise ValueError("Empty JSON payload")
+    if buffer[position] != "[":
+        while read_more():
+            pass
+        yield json.loads(buffer[position:])
+        return
+
+    position += 1
+    expect_item = True
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            raise ValueError("Truncated JSON payload: the array is never closed")
+        if buffer[position] == "]":
+            return
+        if not expect_item:
+            if buffer[position] != ",":
+                raise ValueError(f"Malformed JSON payload near: {buffer[position:position + 40]!r}")
+            position += 1
+            expect_item = True
+            continue
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+                # A number or literal is only complete once a delimiter follows it,
+                # "-4" may continue as "-4.5e10" in the next chunk
+                if isinstance(item, (dict, list, str)) or exhausted or (end < len(buffer) and buffer[end] in ",] \t\r\n"):
+                    break
+            except json.JSONDecodeError:
+                if exhausted:
+                    raise
+            if not read_more():
+                item, end = decoder.raw_decode(buffer, position)
+                break
+        position = end
+        expect_item = False
+        yield item
+
+def iter_text(byte_chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+def iter_file_chunks(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            yield chunk
+
+def load_snapshot(path: str) -> List[Dict]:
+    return list(iter_json_array(iter_text(iter_file_chunks(path))))
+
+# ETag / Last-Modified of the snapshot, stored next to it. The key identifies the
+# endpoint without keeping the access token on disk.
+def snapshot_meta_path(path: str) -> str:
+    return f"{path}.meta.json"
+
+def endpoint_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+
+def read_snapshot_meta(path: str, url: str) -> Dict[str, str]:
+    if not os.path.exists(path) or not os.path.exists(snapshot_meta_path(path)):
+        return {}
+    try:
+        with open(snapshot_meta_path(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return meta if meta.get("endpoint") == endpoint_key(url) else {}
+
+def write_snapshot_meta(path: str, url: str, response: requests.Response) -> None:
+    meta = {
+        "endpoint": endpoint_key(url),
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+    with open(snapshot_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+# Download the catalogue with a conditional GET. A 304 answer reuses the local
+# snapshot; otherwise the body is streamed to the snapshot file and decoded
+# item by item at the same time. If the endpoint stays unreachable after the
+# retries, the last snapshot is used with a warning.
+def fetch_records(url: str, snapshot_path: Optional[str] = FETCH_SNAPSHOT_PATH,
+                  session: Optional[requests.Session] = None) -> List[Dict]:
+    session = session or get_session()
+    meta = read_snapshot_meta(snapshot_path, url) if snapshot_path else {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    def use_snapshot(error: Exception) -> List[Dict]:
+        if snapshot_path and os.path.exists(snapshot_path):
+            print(f"WARNING: fetching the endpoint failed ({error.__class__.__name__}), using the last local snapshot")
+            return load_snapshot(snapshot_path)
+        raise error
+
+    try:
+        response = session.get(url, headers=headers, stream=True, verify=FETCH_VERIFY_TLS,
+                               timeout=(FETCH_CONNECT_TIMEOUT_S, FETCH_READ_TIMEOUT_S))
+        if response.status_code == 304 and meta:
+            response.close()
+            print("Endpoint data unchanged, using the local snapshot")
+            return load_snapshot(snapshot_path)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        return use_snapshot(e)
+
+    encoding = response.encoding or "utf-8"
+    with response:
+        byte_chunks = response.iter_content(CHUNK_SIZE)
+        if not snapshot_path:
+            return list(iter_json_array(iter_text(byte_chunks, encoding)))
+
+        directory = os.path.dirname(snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{snapshot_path}.tmp"
+
+        # The body goes to a temporary file while it is decoded, the snapshot is
+        # only replaced once the whole payload was read and parsed
+        def tee(chunks):
+            with open(temporary, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+
+        try:
+            records = list(iter_json_array(iter_text(tee(byte_chunks), encoding)))
+        except requests.RequestException as e:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return use_snapshot(e)
+        os.replace(temporary, snapshot_path)
+        write_snapshot_meta(snapshot_path, url, response)
+    return records
@@ -0,0 +1,120 @@
+import json
+import math
+import time
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict
+
+# Local stand-in for the catalogue endpoint. Serves a JSON array with ETag and
+# Last-Modified, answers conditional requests with 304 and can fail the first
+# requests to exercise the retry path.
+class CatalogueState:
+    def __init__(self, records: List[Dict], fail_first: int = 0, failure_status: int = 503,
+                 retry_after_s: float = 0, chunk_size: int = 1 << 14):
+        self.lock = threading.Lock()
+        self.fail_first = fail_first
+        self.failure_status = failure_status
+        self.retry_after_s = retry_after_s
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.full_responses = 0
+        self.not_modified = 0
+        self.set_records(records)
+
+    def set_records(self, records: List[Dict]) -> None:
+        body = json.dumps(records, ensure_ascii=False).encode("utf-8")
+        with self.lock:
+            self.body = body
+            self.etag = '"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+            self.last_modified = formatdate(time.time(), usegmt=True)
+
+class CatalogueHandler(BaseHTTPRequestHandler):
+    state: CatalogueState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _not_modified(self) -> bool:
+        etag = self.headers.get("If-None-Match")
+        if etag is not None:
+            return etag == self.state.etag
+        since = self.headers.get("If-Modified-Since")
+        if since is not None:
+            try:
+                return parsedate_to_datetime(since) >= parsedate_to_datetime(self.state.last_modified)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def do_GET(self):
+        state = self.state
+        with state.lock:
+            state.requests += 1
+            failing = state.requests <= state.fail_first
+
+        if failing:
+            self.send_response(state.failure_status)
+            if state.retry_after_s:
+                # Whole seconds, urllib3 rejects a fractional Retry-After
+                self.send_header("Retry-After", str(math.ceil(state.retry_after_s)))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if self._not_modified():
+            with state.lock:
+                state.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", state.etag)
+            self.end_headers()
+            return
+
+        with state.lock:
+            state.full_responses += 1
+        # Chunked transfer, like a large catalogue generated on the fly
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", state.etag)
+        self.send_header("Last-Modified", state.last_modified)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for start in range(0, len(state.body), state.chunk_size):
+                piece = state.body[start:start + state.chunk_size]
+                self.wfile.write(f"{len(piece):X}\r\n".encode("ascii") + piece + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    # Chunked responses need HTTP/1.1
+    protocol_version = "HTTP/1.1"
+
+def serve(records: List[Dict], host: str = "127.0.0.1", port: int = 8001, **options) -> ThreadingHTTPServer:
+    state = CatalogueState(records, **options)
+    handler = type("ConfiguredCatalogueHandler", (CatalogueHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the course catalogue endpoint")
+    parser.add_argument("records", help="JSON file with the array of course records to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer the first N requests with an error")
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=0)
+    args = parser.parse_args()
+
+    with open(args.records, "r", encoding="utf-8") as f:
+        server = serve(json.load(f), args.host, args.port, fail_first=args.fail_first,
+                       failure_status=args.failure_status, retry_after_s=args.retry_after)
+    print(f"Catalogue stand-in listening on http://{args.host}:{args.port}/ (any path, any access-token)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -1,12 +1,15 @@
 import os
-import requests
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 
+from src.data.ingestion import FETCH_SNAPSHOT_PATH, fetch_records
+
 load_dotenv()
 
-def fetch_json() -> List[Dict]:
+# Conditional, streamed download through a pooled session with retries, see ingestion.py.
+# Unchanged data is read back from the local snapshot instead of downloaded again.
+def fetch_json(snapshot_path: Optional[str] = FETCH_SNAPSHOT_PATH) -> List[Dict]:
     base_url = os.getenv('ENDPOINT_URL')
     token = os.getenv('ACCESS_TOKEN')
 
@@ -14,9 +17,7 @@ def fetch_json() -> List[Dict]:
         raise ValueError("Define ENDPOINT_URL and ACCESS_TOKEN in .env")
 
     url = f"{base_url}?access-token={token}"
-    response = requests.get(url, verify=False)
-    response.raise_for_status()
-    return response.json()
+    return fetch_records(url, snapshot_path)
 
 def json_to_df(data: List[Dict]) -> pd.DataFrame:
     column_map = {
@@ -28,34 +29,39 @@ def json_to_df(data: List[Dict]) -> pd.DataFrame:
         'objectivo_materias': 'Objetivo de la materia'
     }
     df = pd.DataFrame(data).rename(columns=column_map)
-    
-    parent_map = {}
-    for _, row in df.iterrows():
-        code = row['Codigo Materia']
-        if not row['Carrera Padre'] or row['Carrera Padre'].strip() == "":
-            parent_map[code] = row['Carreras Hijos'].strip()
+    code_col = 'Codigo Materia'
+    first_cols = ['Nombre Materia', 'Electiva', 'Objetivo de la materia']
+
+    # Rows without a service career hold the real parent; the last one per code wins
+    padre = df['Carrera Padre']
+    is_parent_row = padre.isna() | (padre.astype(str).str.strip() == "")
+    children = df['Carreras Hijos'].str.strip()
+    parents = children[is_parent_row].groupby(df.loc[is_parent_row, code_col], sort=False).last()
+
+    # Every other distinct career teaching the code is a child of the parent
+    real_parent = df[code_col].map(parents)
+    is_child = (
+        real_parent.notna()
+        & (children != real_parent)
+        & ~children.isin(["", "Ninguna"])
+    )
+    child_pairs = (
+        pd.DataFrame({code_col: df.loc[is_child, code_col], 'child': children[is_child]})
+        .drop_duplicates()
+        .sort_values([code_col, 'child'], kind='stable')
+    )
+    children_joined = child_pairs.groupby(code_col, sort=False)['child'].agg('\n'.join)
+
+    first_rows = df.drop_duplicates(subset=code_col, keep='first').set_index(code_col)
 
-    result_rows = []
-    for code, real_parent in parent_map.items():
-        course_rows = df[df['Codigo Materia'] == code]
-        
-        children_set = set()
-        for _, row in course_rows.iterrows():
-            child = row['Carreras Hijos'].strip()
-            if child != real_parent and child not in ["", "Ninguna"]:
-                children_set.add(child)
-        
-        first_row = course_rows.iloc[0]
-        result_rows.append({
-            'Carrera Padre': real_parent,
-            'Carreras Hijos': '\n'.join(sorted(children_set)) if children_set else 'Ninguna',
-            'Codigo Materia': code,
-            'Nombre Materia': first_row['Nombre Materia'],
-            'Electiva': first_row['Electiva'],
-            'Objetivo de la materia': first_row['Objetivo de la materia']
-        })
-    
-    return pd.DataFrame(result_rows)
+    result = pd.DataFrame({
+        'Carrera Padre': parents.to_numpy(),
+        'Carreras Hijos': children_joined.reindex(parents.index).fillna('Ninguna').to_numpy(),
+        code_col: parents.index.to_numpy(),
+    })
+    for col in first_cols:
+        result[col] = first_rows[col].reindex(parents.index).to_numpy()
+    return result
 
 def preprocess_df(df: pd.DataFrame) -> List[Dict]:
     required_cols = [
@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+from typing import Dict, List
+from dotenv import load_dotenv
+import pandas as pd
+
+from src.data.storage import load_frame, save_frame
+from src.model.result_store import RESULT_FIELDS, is_complete, normalize_code
+
+# Load environment variables
+load_dotenv()
+SHARD_DIR = os.getenv("SHARD_DIR", "./data/shards")
+# "career" keeps every Carrera Padre in one shard, "code" spreads courses by a hash of Codigo Materia
+SHARD_BY = os.getenv("SHARD_BY", "career")
+
+SHARD_KEYS = ["career", "code"]
+MANIFEST_NAME = "manifest.json"
+
+# Same value on every machine and Python process, unlike hash()
+def stable_hash(value) -> int:
+    return int(hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:16], 16)
+
+# Shard number of every row. Careers are placed largest first on the least loaded
+# shard, so one big career does not end up next to several others.
+def assign_shards(df: pd.DataFrame, count: int, key: str = SHARD_BY) -> pd.Series:
+    if key == "code":
+        return df["Codigo Materia"].map(lambda code: stable_hash(normalize_code(code)) % count)
+    if key != "career":
+        raise ValueError(f"Unknown shard key '{key}', choose from {', '.join(SHARD_KEYS)}")
+    sizes = df["Carrera Padre"].fillna("").value_counts()
+    loads = [0] * count
+    shard_of = {}
+    for career, size in sorted(sizes.items(), key=lambda item: (-item[1], item[0])):
+        shard = loads.index(min(loads))
+        shard_of[career] = shard
+        loads[shard] += size
+    return df["Carrera Padre"].fillna("").map(shard_of)
+
+# Working files of one shard: its input, results, checkpoint journal, metrics and bulk job state
+def shard_paths(index: int, shard_dir: str = SHARD_DIR) -> Dict[str, str]:
+    directory = os.path.join(shard_dir, f"shard_{index}")
+    return {
+        "processed": os.path.join(directory, "processed.parquet"),
+        "results": os.path.join(directory, "final_results.parquet"),
+        "checkpoint": os.path.join(directory, "checkpoint.jsonl"),
+        "metrics": os.path.join(directory, "metrics.jsonl"),
+        "batch_job": os.path.join(directory, "batch_job.json"),
+    }
+
+def load_manifest(shard_dir: str = SHARD_DIR) -> Dict:
+    path = os.path.join(shard_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No shard manifest at {path}, split the processed data with --shards first")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Write each shard's slice of the processed data and a manifest with the codes it
+# holds. Results left by a previous split are removed so the merge cannot pick them up.
+def split_shards(df: pd.DataFrame, count: int, key: str = SHARD_BY, shard_dir: str = SHARD_DIR,
+                 source: str = "") -> Dict:
+    if count < 1:
+        raise ValueError("The number of shards must be at least 1")
+    shards = assign_shards(df, count, key)
+    manifest = {"count": count, "key": key, "source": source, "shards": []}
+    for index in range(count):
+        paths = shard_paths(index, shard_dir)
+        for path in (paths["results"], paths["checkpoint"], paths["batch_job"]):
+            if os.path.exists(path):
+                os.remove(path)
+        part = df[shards.to_numpy() == index]
+        save_frame(part, paths["processed"])
+        manifest["shards"].append({
+            "index": index,
+            "rows": len(part),
+            "careers": int(part["Carrera Padre"].nunique()),
+            "codes": [normalize_code(code) for code in part["Codigo Materia"]],
+        })
+        print(f"Shard {index}: {len(part)} courses from {manifest['shards'][-1]['careers']} careers")
+
+    directory = shard_dir or "."
+    os.makedirs(directory, exist_ok=True)
+    temporary = os.path.join(directory, f"{MANIFEST_NAME}.tmp")
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temporary, os.path.join(directory, MANIFEST_NAME))
+    print(f"Split {len(df)} courses into {count} shards by {key} in {shard_dir}")
+    return manifest
+
+# Result files of every shard, the merge stage's input
+def shard_result_paths(shard_dir: str = SHARD_DIR) -> List[str]:
+    return [shard_paths(shard["index"], shard_dir)["results"] for shard in load_manifest(shard_dir)["shards"]]
+
+# Combine the results of every shard and check them against the manifest:
+# each code of the split must come back exactly once
+def merge_shards(shard_dir: str = SHARD_DIR) -> pd.DataFrame:
+    manifest = load_manifest(shard_dir)
+    unfinished = [shard["index"] for shard in manifest["shards"]
+                  if not os.path.exists(shard_paths(shard["index"], shard_dir)["results"])]
+    if unfinished:
+        raise RuntimeError(f"Shard(s) {', '.join(map(str, unfinished))} have no results yet, run them with --shard")
+
+    merged = pd.concat([load_frame(shard_paths(shard["index"], shard_dir)["results"]) for shard in manifest["shards"]],
+                       ignore_index=True)
+    codes = merged["Codigo Materia"].map(normalize_code)
+    expected = {code for shard in manifest["shards"] for code in shard["codes"]}
+    duplicated = sorted(set(codes[codes.duplicated()]))
+    missing = sorted(expected - set(codes))
+    unexpected = sorted(set(codes) - expected)
+    problems = []
+    for label, found in (("missing", missing), ("duplicated", duplicated), ("not in the split", unexpected)):
+        if found:
+            problems.append(f"{len(found)} {label} ({', '.join(found[:10])}{', ...' if len(found) > 10 else ''})")
+    if problems:
+        raise ValueError(f"Shard results do not match the split: {'; '.join(problems)}")
+
+    incomplete = sum(
+        not (all(pd.notna(value) for value in row) and is_complete(dict(zip(RESULT_FIELDS, row))))
+        for row in merged.reindex(columns=RESULT_FIELDS).itertuples(index=False)
+    )
+    print(f"Merged {len(merged)} courses from {manifest['count']} shards"
+          + (f", {incomplete} with an incomplete evaluation" if incomplete else ""))
+
+    if "Carrera Padre" in merged.columns:
+        merged = merged.sort_values(by="Carrera Padre", ascending=True, kind="stable").reset_index(drop=True)
+    return merged
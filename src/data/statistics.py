@@ -1,27 +1,77 @@
+from typing import Optional, Union
 import pandas as pd
 
-def smart_statistics(final_results_csv, output_csv="estadisticas_por_carrera.csv"):
-    df = pd.read_csv(final_results_csv)
+CRITERIA = ["S", "M", "A", "R", "T"]
+VERDICTS = ["Sí", "Parcialmente", "No"]
+VERDICT_TYPE = pd.CategoricalDtype(VERDICTS)
+# The verdict is the first word of each criterion's evaluation, e.g. "Parcialmente. El objetivo..."
+VERDICT_PATTERN = r"^\s*(Sí|Parcialmente|No)\."
+# Verdict column prefixes in the output; "Total_" keeps the original Sí counts
+COUNT_PREFIXES = {"Sí": "Total", "Parcialmente": "Parcialmente", "No": "No"}
 
-    # Replace NaN with empty string to avoid errors with .str
-    for col in ["S", "M", "A", "R", "T"]:
-        df[col] = df[col].fillna("").astype(str)
+# Pull the verdict out of each criterion once, as categorical columns (NaN when unrecognised)
+def extract_verdicts(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        criterion: df[criterion].astype("string").str.extract(VERDICT_PATTERN, expand=False).astype(VERDICT_TYPE)
+        for criterion in CRITERIA
+    }, index=df.index)
 
-    stats = df.groupby("Carrera Padre").agg(
-        Total_asignaturas=("Codigo Materia", "nunique"),
-        Total_S=("S", lambda x: x.str.startswith(("Sí.")).sum()),
-        Total_M=("M", lambda x: x.str.startswith(("Sí.")).sum()),
-        Total_A=("A", lambda x: x.str.startswith(("Sí.")).sum()),
-        Total_R=("R", lambda x: x.str.startswith(("Sí.")).sum()),
-        Total_T=("T", lambda x: x.str.startswith(("Sí.")).sum())
-    ).reset_index()
+# Sí / Parcialmente / No counts and percentages per group and criterion, plus a
+# TOTAL GENERAL row. All verdicts are counted in one groupby over the long form.
+def verdict_statistics(groups: pd.Series, codes: pd.Series, verdicts: pd.DataFrame, group_label: str) -> pd.DataFrame:
+    long = verdicts.assign(_group=groups.to_numpy()).melt(
+        id_vars="_group", var_name="Criterio", value_name="Veredicto"
+    )
+    long["Veredicto"] = long["Veredicto"].astype(VERDICT_TYPE)
+    counts = (
+        long.groupby(["_group", "Criterio", "Veredicto"], observed=False, sort=True).size()
+        .unstack(["Criterio", "Veredicto"], fill_value=0)
+    )
+    counts.loc["TOTAL GENERAL"] = counts.sum()
 
-    stats.rename(columns={"Carrera Padre": "Carrera"}, inplace=True)
+    rows = groups.groupby(groups.to_numpy()).size()
+    rows.loc["TOTAL GENERAL"] = len(groups)
+    subjects = codes.groupby(groups.to_numpy()).nunique()
+    subjects.loc["TOTAL GENERAL"] = codes.nunique()
 
-    # Add summary row with totals including all careers
-    totals = stats.sum(numeric_only=True)
-    totals["Carrera"] = "TOTAL GENERAL"
-    stats = pd.concat([stats, pd.DataFrame([totals])], ignore_index=True)
+    stats = pd.DataFrame(index=counts.index)
+    stats["Total_asignaturas"] = subjects
+    for criterion in CRITERIA:
+        for verdict in VERDICTS:
+            stats[f"{COUNT_PREFIXES[verdict]}_{criterion}"] = counts[(criterion, verdict)]
+    for criterion in CRITERIA:
+        for verdict in VERDICTS:
+            stats[f"Porcentaje_{verdict}_{criterion}"] = (counts[(criterion, verdict)] / rows * 100).round(1)
 
+    stats.index.name = group_label
+    return stats.reset_index()
+
+# One row per course and child career, courses that serve no other career are left out
+def explode_child_careers(df: pd.DataFrame) -> pd.DataFrame:
+    children = df["Carreras Hijos"].fillna("").astype(str).str.split("\n")
+    exploded = df.assign(**{"Carrera Hija": children}).explode("Carrera Hija")
+    exploded["Carrera Hija"] = exploded["Carrera Hija"].str.strip()
+    return exploded[~exploded["Carrera Hija"].isin(["", "Ninguna"])]
+
+# Accepts the results DataFrame directly (or a CSV path, for standalone use).
+# Writes the statistics by responsible career and, when child_output_csv is
+# given, the same breakdown by each career the course serves.
+def smart_statistics(results: Union[pd.DataFrame, str], output_csv="estadisticas_por_carrera.csv",
+                     child_output_csv: Optional[str] = None) -> pd.DataFrame:
+    df = pd.read_csv(results) if isinstance(results, str) else results
+
+    verdicts = extract_verdicts(df)
+    stats = verdict_statistics(df["Carrera Padre"], df["Codigo Materia"], verdicts, "Carrera")
     stats.to_csv(output_csv, index=False)
     print(f"Statistics saved in {output_csv}")
+
+    if child_output_csv:
+        # Positional index, so each exploded row points back to its verdicts
+        exploded = explode_child_careers(df[["Carreras Hijos", "Codigo Materia"]].reset_index(drop=True))
+        child_stats = verdict_statistics(
+            exploded["Carrera Hija"], exploded["Codigo Materia"], verdicts.iloc[exploded.index], "Carrera"
+        )
+        child_stats.to_csv(child_output_csv, index=False)
+        print(f"Statistics by child career saved in {child_output_csv}")
+
+    return stats
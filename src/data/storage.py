@@ -0,0 +1,35 @@
+import os
+import pandas as pd
+
+# Intermediate results are stored in columnar formats: long multi-line texts
+# round-trip exactly and nothing has to be re-parsed by the CSV reader.
+# The format follows the file extension, CSV remains available for exports.
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+def _extension(path: str) -> str:
+    return os.path.splitext(path)[1].lower()
+
+def save_frame(df: pd.DataFrame, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    extension = _extension(path)
+    if extension in PARQUET_EXTENSIONS:
+        df.to_parquet(path, index=False)
+    elif extension in ARROW_EXTENSIONS:
+        df.reset_index(drop=True).to_feather(path)
+    elif extension == ".csv":
+        df.to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported file format for {path}, use .parquet, .arrow or .csv")
+
+def load_frame(path: str) -> pd.DataFrame:
+    extension = _extension(path)
+    if extension in PARQUET_EXTENSIONS:
+        return pd.read_parquet(path)
+    if extension in ARROW_EXTENSIONS:
+        return pd.read_feather(path)
+    if extension == ".csv":
+        return pd.read_csv(path)
+    raise ValueError(f"Unsupported file format for {path}, use .parquet, .arrow or .csv")
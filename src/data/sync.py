@@ -0,0 +1,122 @@
+import os
+import hashlib
+from typing import Callable
+from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
+
+from src.data.statistics import CRITERIA, extract_verdicts
+from src.data.storage import save_frame
+from src.model.evaluation_cache import normalize_objective
+from src.model.result_store import RESULT_FIELDS, is_complete, normalize_code
+
+# Load environment variables
+load_dotenv()
+SYNC_DELTA_PATH = os.getenv("SYNC_DELTA_PATH", "./data/sync_delta.csv")
+
+CHANGE_COLUMN = "Cambio"
+
+# Objectives that only differ in whitespace hash the same, like the evaluation cache keys
+def objective_hash(text) -> str:
+    return hashlib.sha256(normalize_objective(text).encode("utf-8")).hexdigest()[:16]
+
+def by_code(df: pd.DataFrame) -> pd.DataFrame:
+    return df.assign(_code=df["Codigo Materia"].map(normalize_code)).drop_duplicates("_code", keep="last").set_index("_code")
+
+# Sort every course of both catalogues into added, modified (objective text changed),
+# unchanged and removed, matched by Codigo Materia
+def classify_changes(current: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    new = by_code(current)["Objetivo de la materia"]
+    old = by_code(previous)["Objetivo de la materia"]
+    changes = pd.DataFrame({"Objetivo anterior": old, "Objetivo nuevo": new})
+    in_old = changes.index.isin(old.index)
+    in_new = changes.index.isin(new.index)
+    same = changes["Objetivo anterior"].map(objective_hash, na_action="ignore") == changes["Objetivo nuevo"].map(objective_hash, na_action="ignore")
+    changes[CHANGE_COLUMN] = np.select(
+        [~in_old, ~in_new, ~same.to_numpy()], ["added", "removed", "modified"], "unchanged"
+    )
+    changes.index.name = "Codigo Materia"
+    return changes
+
+# "M: No → Sí" for every criterion whose verdict differs between the two evaluations
+def verdict_changes(old: pd.DataFrame, new: pd.DataFrame) -> pd.Series:
+    old_verdicts = extract_verdicts(old).astype(object).fillna("—")
+    new_verdicts = extract_verdicts(new).astype(object).fillna("—")
+    return pd.Series([
+        ", ".join(f"{criterion}: {before} → {after}"
+                  for criterion, before, after in zip(CRITERIA, old_row, new_row) if before != after)
+        for old_row, new_row in zip(old_verdicts.itertuples(index=False), new_verdicts.itertuples(index=False))
+    ], index=new.index, dtype=object)
+
+# Re-evaluate only added and modified courses (plus unchanged ones whose previous
+# evaluation is incomplete), keep the previous verdicts for the rest and drop removed
+# courses. evaluate receives the rows to send to the model and returns them evaluated.
+# Writes the delta of every course that changed and returns the merged results.
+def sync_results(current: pd.DataFrame, previous: pd.DataFrame, evaluate: Callable[[pd.DataFrame], pd.DataFrame],
+                 delta_path: str = SYNC_DELTA_PATH) -> pd.DataFrame:
+    changes = classify_changes(current, previous)
+    codes = current["Codigo Materia"].map(normalize_code)
+    change = codes.map(changes[CHANGE_COLUMN])
+
+    previous_by_code = by_code(previous)
+    result_columns = [column for column in previous.columns if column not in current.columns]
+    previous_results = previous_by_code.reindex(codes.to_numpy())
+    previous_results.index = current.index
+    for field in RESULT_FIELDS:
+        if field not in previous_results.columns:
+            previous_results[field] = None
+    complete = pd.Series([
+        all(pd.notna(value) for value in row) and is_complete(dict(zip(RESULT_FIELDS, row)))
+        for row in previous_results[RESULT_FIELDS].itertuples(index=False)
+    ], index=current.index)
+    to_evaluate = change.isin(["added", "modified"]) | (change.eq("unchanged") & ~complete)
+    incomplete = int((change.eq("unchanged") & ~complete).sum())
+    print(
+        f"Sync: {int(change.eq('added').sum())} added, {int(change.eq('modified').sum())} modified, "
+        f"{int(change.eq('unchanged').sum())} unchanged, {int((changes[CHANGE_COLUMN] == 'removed').sum())} removed"
+        + (f" ({incomplete} unchanged with an incomplete evaluation)" if incomplete else "")
+    )
+    print(f"Sending {int(to_evaluate.sum())} courses to the model, keeping the previous verdicts for the rest")
+
+    merged = current.copy()
+    for column in result_columns:
+        merged[column] = previous_results[column].astype(object).where(~to_evaluate, None)
+
+    if to_evaluate.any():
+        evaluated = by_code(evaluate(current[to_evaluate].copy()))
+        new_columns = [column for column in evaluated.columns if column not in current.columns]
+        for column in new_columns:
+            merged[column] = merged[column].astype(object) if column in merged.columns else None
+        aligned = evaluated.reindex(codes[to_evaluate].to_numpy())[new_columns]
+        merged.loc[to_evaluate, new_columns] = aligned.to_numpy()
+
+    # Delta: every course that is not an unchanged one with a complete evaluation
+    touched = to_evaluate.to_numpy()
+    delta = pd.DataFrame({
+        "Codigo Materia": current.loc[touched, "Codigo Materia"].to_numpy(),
+        "Nombre Materia": current.loc[touched, "Nombre Materia"].to_numpy(),
+        "Carrera Padre": current.loc[touched, "Carrera Padre"].to_numpy(),
+        CHANGE_COLUMN: change[touched].replace({"unchanged": "re-evaluated"}).to_numpy(),
+        "Objetivo anterior": codes[touched].map(changes["Objetivo anterior"]).to_numpy(),
+        "Objetivo nuevo": current.loc[touched, "Objetivo de la materia"].to_numpy(),
+        "Veredictos cambiados": verdict_changes(previous_results.loc[touched], merged.loc[touched]).to_numpy(),
+    })
+    removed = changes[changes[CHANGE_COLUMN] == "removed"]
+    if len(removed):
+        old = previous_by_code.loc[removed.index]
+        delta = pd.concat([delta, pd.DataFrame({
+            "Codigo Materia": old["Codigo Materia"].to_numpy(),
+            "Nombre Materia": old["Nombre Materia"].to_numpy() if "Nombre Materia" in old else None,
+            "Carrera Padre": old["Carrera Padre"].to_numpy() if "Carrera Padre" in old else None,
+            CHANGE_COLUMN: "removed",
+            "Objetivo anterior": removed["Objetivo anterior"].to_numpy(),
+            "Objetivo nuevo": None,
+            "Veredictos cambiados": "",
+        })], ignore_index=True)
+
+    save_frame(delta, delta_path)
+    print(f"Delta summary saved to {delta_path}")
+
+    if "Carrera Padre" in merged.columns:
+        merged = merged.sort_values(by="Carrera Padre", ascending=True, kind="stable").reset_index(drop=True)
+    return merged
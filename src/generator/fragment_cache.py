@@ -0,0 +1,80 @@
+import os
+import time
+import sqlite3
+from typing import Dict, List
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+REPORT_FRAGMENT_CACHE_PATH = os.getenv("REPORT_FRAGMENT_CACHE_PATH", "./data/report_fragments.sqlite")
+REPORT_FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_FRAGMENT_CACHE_MAX_ENTRIES", 200000))
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_CHUNK_SIZE = 500
+
+# On-disk SQLite store of rendered HTML table rows keyed by a hash of the row content
+class FragmentCache:
+    def __init__(self, path: str = REPORT_FRAGMENT_CACHE_PATH,
+                 max_entries: int = REPORT_FRAGMENT_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fragments ("
+            "key TEXT PRIMARY KEY, "
+            "html TEXT NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_fragment_access ON fragments(last_access)")
+        self.conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        now = time.time()
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+        for start in range(0, len(unique_keys), LOOKUP_CHUNK_SIZE):
+            chunk = unique_keys[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, html FROM fragments WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(rows)
+            self.conn.execute(
+                f"UPDATE fragments SET last_access = ? WHERE key IN ({placeholders})", [now, *chunk]
+            )
+        self.hits += len(found)
+        self.misses += len(unique_keys) - len(found)
+        return found
+
+    def put_many(self, fragments: Dict[str, str]) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO fragments (key, html, last_access) VALUES (?, ?, ?)",
+            [(key, html, now) for key, html in fragments.items()]
+        )
+
+    # Drop the least recently used fragments above max_entries
+    def evict(self) -> int:
+        removed = 0
+        total = self.conn.execute("SELECT COUNT(*) FROM fragments").fetchone()[0]
+        if total > self.max_entries:
+            removed = self.conn.execute(
+                "DELETE FROM fragments WHERE key IN ("
+                "SELECT key FROM fragments ORDER BY last_access ASC LIMIT ?)",
+                (total - self.max_entries,)
+            ).rowcount
+        self.conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
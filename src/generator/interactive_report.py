@@ -0,0 +1,370 @@
+import os
+import json
+from datetime import datetime
+import pandas as pd
+
+from src.generator.report_generator import REPORT_COLUMNS, format_output, replace_newlines_for_column
+
+CRITERIA = ['S', 'M', 'A', 'R', 'T']
+VERDICT_LABELS = ["Sí", "Parcialmente", "No"]
+
+# Compact payload: careers are stored once and referenced by index, each verdict
+# is split into an index into VERDICT_LABELS (-1 when unrecognised) and its explanation
+def build_payload(evaluation_dataframe: pd.DataFrame) -> dict:
+    careers = sorted(evaluation_dataframe['Carrera Padre'].fillna("").astype(str).unique())
+    career_index = {career: i for i, career in enumerate(careers)}
+
+    columns = {
+        'career': evaluation_dataframe['Carrera Padre'].fillna("").astype(str).map(career_index),
+        'children': evaluation_dataframe['Carreras Hijos'].fillna("").astype(str),
+        'code': evaluation_dataframe['Codigo Materia'].fillna("").astype(str),
+        'name': evaluation_dataframe['Nombre Materia'].fillna("").astype(str),
+        'objective': evaluation_dataframe['Objetivo de la materia'].fillna("").astype(str).str.replace('\t', ' ', regex=False),
+    }
+    for criterion in CRITERIA:
+        parts = evaluation_dataframe[criterion].fillna("").astype(str).str.split(' ', n=1)
+        label = parts.str[0].str.strip().str.rstrip('.')
+        columns[f'{criterion}_verdict'] = label.map({v: i for i, v in enumerate(VERDICT_LABELS)}).fillna(-1).astype(int)
+        columns[f'{criterion}_text'] = parts.str[1].fillna("")
+    columns['improved'] = replace_newlines_for_column(
+        evaluation_dataframe['Objetivo Mejorado'].fillna("").astype(str).apply(format_output)
+    )
+
+    rows = pd.DataFrame(columns).to_numpy(dtype=object).tolist()
+    return {
+        'generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'careers': careers,
+        'verdicts': VERDICT_LABELS,
+        'criteria': CRITERIA,
+        'headers': [REPORT_COLUMNS[column] for column in REPORT_COLUMNS] + ['Objetivo Mejorado'],
+        'fields': list(columns),
+        'rows': rows,
+    }
+
+VIEWER_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Reporte SMART</title>
+    <style>
+        body {
+            font-family: "Segoe UI", Tahoma, Geneva, Verdana, sans-serif;
+            background-color: #f9f9f9;
+            margin: 20px 20px 5px 20px;
+        }
+        h1 {
+            color: #333;
+            margin-bottom: 10px;
+        }
+        .filters {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 10px;
+            align-items: center;
+            margin-bottom: 10px;
+        }
+        .filters input, .filters select {
+            padding: 6px;
+            font-size: 14px;
+        }
+        .filters input {
+            min-width: 280px;
+        }
+        .grid-header, .grid-row {
+            display: grid;
+            grid-template-columns: 180px 160px 100px 180px 320px repeat(5, 240px) 380px;
+            min-width: 2580px;
+        }
+        .grid-header {
+            background-color: #413d83;
+            color: white;
+            font-weight: bold;
+            text-align: center;
+            position: sticky;
+            top: 0;
+            z-index: 1;
+        }
+        .grid-header div, .grid-row div {
+            border: 1px solid #ddd;
+            padding: 8px;
+            font-size: 14px;
+            overflow: hidden;
+            box-sizing: border-box;
+        }
+        .grid-row div {
+            white-space: pre-line;
+        }
+        .grid-row .html-cell {
+            white-space: normal;
+        }
+        .viewport {
+            height: calc(100vh - 170px);
+            overflow: auto;
+            background: white;
+            border-radius: 10px;
+            box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);
+            position: relative;
+        }
+        .grid-row {
+            position: absolute;
+            left: 0;
+            height: ROW_HEIGHT_PXpx;
+            cursor: pointer;
+        }
+        .grid-row.even {
+            background-color: #f2f2f2;
+        }
+        .grid-row:hover {
+            background-color: #e6e4f5;
+        }
+        .detail {
+            display: none;
+            position: fixed;
+            top: 5%;
+            left: 10%;
+            width: 80%;
+            max-height: 85%;
+            overflow: auto;
+            background: white;
+            padding: 20px;
+            border-radius: 10px;
+            box-shadow: 0 0 30px rgba(0, 0, 0, 0.4);
+            z-index: 2;
+        }
+        .detail h3 {
+            margin-bottom: 4px;
+            color: #413d83;
+        }
+        .detail .text {
+            white-space: pre-line;
+        }
+    </style>
+</head>
+<body>
+    <h1>Reporte de Evaluación SMART - UPB</h1>
+    <div class="filters">
+        <input id="search" type="search" placeholder="Buscar código, materia u objetivo...">
+        <select id="career"><option value="">Todas las carreras</option></select>
+        <span id="criteria-filters"></span>
+        <span id="count"></span>
+    </div>
+    <div class="viewport" id="viewport">
+        <div class="grid-header" id="header"></div>
+        <div id="spacer" style="position: relative;"></div>
+    </div>
+    <div class="detail" id="detail"></div>
+    <script src="DATA_FILE"></script>
+    <script>
+    (function () {
+        var data = window.SMART_REPORT;
+        var F = {};
+        data.fields.forEach(function (name, i) { F[name] = i; });
+        var ROW_HEIGHT = ROW_HEIGHT_PX;
+        var OVERSCAN = 10;
+        var ICONS = ["✅", "⚠️", "❌"];
+        var rows = data.rows;
+        var filtered = rows.map(function (_, i) { return i; });
+        var haystack = null;
+
+        var viewport = document.getElementById("viewport");
+        var spacer = document.getElementById("spacer");
+        var header = document.getElementById("header");
+        var detail = document.getElementById("detail");
+
+        data.headers.forEach(function (title) {
+            var cell = document.createElement("div");
+            cell.textContent = title;
+            header.appendChild(cell);
+        });
+
+        var careerSelect = document.getElementById("career");
+        data.careers.forEach(function (career, i) {
+            var option = document.createElement("option");
+            option.value = String(i);
+            option.textContent = career;
+            careerSelect.appendChild(option);
+        });
+
+        var criteriaSelects = {};
+        var criteriaFilters = document.getElementById("criteria-filters");
+        data.criteria.forEach(function (criterion) {
+            var select = document.createElement("select");
+            var all = document.createElement("option");
+            all.value = "";
+            all.textContent = criterion + ": todos";
+            select.appendChild(all);
+            data.verdicts.forEach(function (verdict, i) {
+                var option = document.createElement("option");
+                option.value = String(i);
+                option.textContent = criterion + ": " + ICONS[i] + " " + verdict;
+                select.appendChild(option);
+            });
+            select.addEventListener("change", applyFilters);
+            criteriaFilters.appendChild(select);
+            criteriaSelects[criterion] = select;
+        });
+
+        // Lowercased searchable text per row, built on the first search only
+        function buildHaystack() {
+            haystack = rows.map(function (row) {
+                return [row[F.code], row[F.name], row[F.objective], row[F.children], data.careers[row[F.career]]]
+                    .join(" ").toLowerCase();
+            });
+        }
+
+        function applyFilters() {
+            var term = document.getElementById("search").value.trim().toLowerCase();
+            var career = careerSelect.value === "" ? -1 : Number(careerSelect.value);
+            var wanted = [];
+            data.criteria.forEach(function (criterion) {
+                var value = criteriaSelects[criterion].value;
+                if (value !== "") { wanted.push([F[criterion + "_verdict"], Number(value)]); }
+            });
+            if (term && haystack === null) { buildHaystack(); }
+
+            filtered = [];
+            for (var i = 0; i < rows.length; i++) {
+                var row = rows[i];
+                if (career >= 0 && row[F.career] !== career) { continue; }
+                var ok = true;
+                for (var j = 0; j < wanted.length; j++) {
+                    if (row[wanted[j][0]] !== wanted[j][1]) { ok = false; break; }
+                }
+                if (!ok || (term && haystack[i].indexOf(term) === -1)) { continue; }
+                filtered.push(i);
+            }
+            document.getElementById("count").textContent = filtered.length + " de " + rows.length + " asignaturas";
+            spacer.style.height = (filtered.length * ROW_HEIGHT) + "px";
+            viewport.scrollTop = 0;
+            render(true);
+        }
+
+        function verdictText(row, criterion) {
+            var verdict = row[F[criterion + "_verdict"]];
+            var label = verdict >= 0 ? ICONS[verdict] + " " + data.verdicts[verdict] + "." : "";
+            return label + "\\n" + row[F[criterion + "_text"]];
+        }
+
+        function makeCell(parent, text, html) {
+            var cell = document.createElement("div");
+            if (html) {
+                cell.className = "html-cell";
+                cell.innerHTML = text;
+            } else {
+                cell.textContent = text;
+            }
+            parent.appendChild(cell);
+        }
+
+        function makeRow(position) {
+            var index = filtered[position];
+            var row = rows[index];
+            var element = document.createElement("div");
+            element.className = "grid-row" + (position % 2 ? " even" : "");
+            element.style.top = (position * ROW_HEIGHT) + "px";
+            makeCell(element, data.careers[row[F.career]]);
+            makeCell(element, row[F.children]);
+            makeCell(element, row[F.code]);
+            makeCell(element, row[F.name]);
+            makeCell(element, row[F.objective]);
+            data.criteria.forEach(function (criterion) { makeCell(element, verdictText(row, criterion)); });
+            makeCell(element, row[F.improved], true);
+            element.addEventListener("click", function () { showDetail(index); });
+            return element;
+        }
+
+        // Only the rows inside the visible window (plus a margin) exist in the DOM
+        var rendered = [-1, -1];
+        function render(force) {
+            var first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN);
+            var visible = Math.ceil(viewport.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN;
+            var last = Math.min(filtered.length, first + visible);
+            if (!force && first === rendered[0] && last === rendered[1]) { return; }
+            rendered = [first, last];
+            var fragment = document.createDocumentFragment();
+            for (var position = first; position < last; position++) {
+                fragment.appendChild(makeRow(position));
+            }
+            spacer.replaceChildren(fragment);
+        }
+
+        function showDetail(index) {
+            var row = rows[index];
+            detail.replaceChildren();
+            var close = document.createElement("button");
+            close.textContent = "Cerrar";
+            close.addEventListener("click", function () { detail.style.display = "none"; });
+            detail.appendChild(close);
+            var sections = [
+                [data.headers[3], row[F.code] + " - " + row[F.name]],
+                [data.headers[0], data.careers[row[F.career]]],
+                [data.headers[1], row[F.children]],
+                [data.headers[4], row[F.objective]]
+            ];
+            data.criteria.forEach(function (criterion, i) {
+                sections.push([data.headers[5 + i], verdictText(row, criterion)]);
+            });
+            sections.forEach(function (section) {
+                var title = document.createElement("h3");
+                title.textContent = section[0];
+                var text = document.createElement("div");
+                text.className = "text";
+                text.textContent = section[1];
+                detail.appendChild(title);
+                detail.appendChild(text);
+            });
+            var title = document.createElement("h3");
+            title.textContent = "Objetivo Mejorado";
+            var improved = document.createElement("div");
+            improved.innerHTML = row[F.improved];
+            detail.appendChild(title);
+            detail.appendChild(improved);
+            detail.style.display = "block";
+        }
+
+        var searchTimer = null;
+        document.getElementById("search").addEventListener("input", function () {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(applyFilters, 200);
+        });
+        careerSelect.addEventListener("change", applyFilters);
+        viewport.addEventListener("scroll", function () { window.requestAnimationFrame(function () { render(false); }); });
+        window.addEventListener("resize", function () { render(true); });
+        document.addEventListener("keydown", function (event) {
+            if (event.key === "Escape") { detail.style.display = "none"; }
+        });
+        applyFilters();
+    })();
+    </script>
+</body>
+</html>
+"""
+
+ROW_HEIGHT_PX = 140
+
+# Report as a JSON payload plus a small HTML/JS viewer. The viewer only keeps the
+# visible rows in the DOM (virtual scrolling) and filters by career, by each
+# SMART verdict and by free text on the client, so it stays responsive with
+# tens of thousands of courses. The payload is wrapped in a script assignment
+# so the report also opens straight from disk (file://), where fetch() is blocked.
+def generate_interactive_report(evaluation_dataframe: pd.DataFrame, reports_dir: str = None) -> str:
+    date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'reports')
+    report_dir = os.path.join(reports_dir, f"Report_{date}_interactive")
+    os.makedirs(report_dir, exist_ok=True)
+
+    payload = build_payload(evaluation_dataframe)
+    data_file = "report_data.js"
+    with open(os.path.join(report_dir, data_file), "w", encoding="utf-8") as f:
+        f.write("window.SMART_REPORT = ")
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        f.write(";\n")
+
+    index_path = os.path.join(report_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(VIEWER_TEMPLATE.replace("ROW_HEIGHT_PX", str(ROW_HEIGHT_PX)).replace("DATA_FILE", data_file))
+
+    print(f"Generated interactive report: {report_dir} ({len(payload['rows'])} rows)")
+    return index_path
@@ -2,17 +2,97 @@ import re
 import pandas as pd
 from datetime import datetime
 import os
-    
+import sys
+import hashlib
+import unicodedata
+from typing import List
+
+from src.generator.fragment_cache import FragmentCache
+from src.pipeline import code_fingerprint
+
+REPORT_COLUMNS = {
+    'Carrera Padre': 'Carrera Responsable',
+    'Carreras Hijos': 'Da servicio a:',
+    'Codigo Materia': 'Código',
+    'Nombre Materia': 'Materia',
+    'Objetivo de la materia': 'Objetivo de la Materia',
+    'S': 'S (Específico)',
+    'M': 'M (Medible)',
+    'A': 'A (Alcanzable)',
+    'R': 'R (Relevante)',
+    'T': 'T (Temporal)'
+}
+CRITERIA_COLUMNS = ['S (Específico)', 'M (Medible)', 'A (Alcanzable)', 'R (Relevante)', 'T (Temporal)']
+
+REPORT_STYLE = """
+            body {
+                font-family: "Segoe UI", Tahoma, Geneva, Verdana, sans-serif;
+                background-color: #f9f9f9;
+                margin: 20px 20px 5px 20px;
+            }
+            h1 {
+                color: #333;
+            }
+            .table-container {
+                height: 90%;
+                overflow-y: auto;
+                overflow-x: auto;
+                background: white;
+                padding: 0;
+                border-radius: 10px;
+                box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);
+            }
+            table {
+                border-collapse: separate;
+                border-spacing: 0;
+                width: 100%;
+                border: 1px solid #ddd;
+                border-radius: 10px;
+                min-width: 2400px;
+            }
+            th, td {
+                border: 1px solid #ddd;
+                padding: 12px;
+                text-align: left;
+                vertical-align: top;
+                font-size: 14px;
+            }
+            th {
+                background-color: #413d83 !important;
+                color: white;
+                font-weight: bold;
+                text-align: center;
+                position: sticky;
+                top: 0;
+                z-index: 1;
+            }
+            tr:nth-child(even) {
+                background-color: #f2f2f2;
+            }
+            b {
+                color: #333;
+            }
+
+            @media (max-width: 600px) {
+                table {
+                    min-width: 2000px;
+                }
+            }
+"""
+
+VERDICT_ICONS = {"Sí.": "✅", "Parcialmente.": "⚠️", "No.": "❌"}
+
+# Patterns used by format_output, compiled once
+STRAY_ASTERISK_LINE = re.compile(r'^\*$', flags=re.MULTILINE)
+SUGGESTION_HEADER = re.compile(r'(Sugerencias para criterio [^\n<]+:)')
+TRAILING_RULE = re.compile(r'(-{2,}\s*(<br>|\n|\r|\s)*)+$')
+REPEATED_BR = re.compile(r'(<br>\s*){2,}')
+REPEATED_NEWLINES = re.compile(r'(\n\s*){2,}')
+
 def create_icon_for_text(text: str) -> str:
     parts = text.split(' ')
     first_part = parts[0].strip()
-    icon = ""
-    if first_part == "Sí.":
-        icon = "✅"
-    elif first_part == "Parcialmente.":
-        icon = "⚠️"
-    elif first_part == "No.":
-        icon = "❌"
+    icon = VERDICT_ICONS.get(first_part, "")
 
     first_part_bold = f"<b>{first_part}</b>"
     rest = " ".join([p for p in parts[1:]])
@@ -20,19 +100,30 @@ def create_icon_for_text(text: str) -> str:
         return f"{icon} {first_part_bold}<br>{rest}"
     else:
         return f"{icon} {first_part_bold}"
+
+# Same output as create_icon_for_text for a whole column at once
+def create_icons_for_column(texts: pd.Series) -> pd.Series:
+    parts = texts.str.split(' ', n=1)
+    first_part = parts.str[0].str.strip()
+    rest = parts.str[1].fillna("")
+    html = first_part.map(VERDICT_ICONS).fillna("") + " <b>" + first_part + "</b>"
+    return html.where(rest == "", html + "<br>" + rest)
     
 def replace_newlines_for_html(text: str) -> str:
     # Replace \r\n and \n for <br>
     return text.replace('\r\n', '<br>').replace('\n', '<br>')
 
+def replace_newlines_for_column(texts: pd.Series) -> pd.Series:
+    return texts.str.replace('\r\n', '<br>', regex=False).str.replace('\n', '<br>', regex=False)
+
 def format_output(text: str) -> str:
     lines = text.splitlines()
 
-    text = re.sub(r'^\*$', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\*', '', text)
+    text = STRAY_ASTERISK_LINE.sub('', text)
+    text = text.replace('*', '')
 
     # Find all matches for "Sugerencias para criterio ..."
-    matches = list(re.finditer(r'(Sugerencias para criterio [^\n<]+:)', text))
+    matches = list(SUGGESTION_HEADER.finditer(text))
     if matches:
         # Add <br><br> before the first, bold all
         first = matches[0]
@@ -45,11 +136,11 @@ def format_output(text: str) -> str:
         # Bold the rest (skip the first, already bolded)
         for m in matches[1:]:
             # Find the current string again (since text has changed)
-            text = re.sub(re.escape(m.group(1)), f"<b>{m.group(1)}</b>", text, count=1)
+            text = text.replace(m.group(1), f"<b>{m.group(1)}</b>", 1)
 
-    text = re.sub(r'(-{2,}\s*(<br>|\n|\r|\s)*)+$', '', text.strip())
-    text = re.sub(r'(<br>\s*){2,}', '<br>', text)
-    text = re.sub(r'(\n\s*){2,}', '\n', text)
+    text = TRAILING_RULE.sub('', text.strip())
+    text = REPEATED_BR.sub('<br>', text)
+    text = REPEATED_NEWLINES.sub('\n', text)
 
     if lines and lines[0].strip() != "El objetivo es adecuado y no requiere mejoras.":
         text = f"<b>Objetivo Mejorado:</b><br>{text}"
@@ -61,109 +152,218 @@ def clean_bullets_and_tabs(text: str) -> str:
     text = text.replace('\t', ' ')
     return text
 
-def generate_html_report(evaluation_dataframe: pd.DataFrame) -> None:
-    # Define the HTML structure
+# Rename columns and apply the cell transforms used by every report mode
+def prepare_report_df(evaluation_dataframe: pd.DataFrame) -> pd.DataFrame:
     html_df = evaluation_dataframe.copy()
-    html_df = html_df.rename(columns={
-        'Carrera Padre': 'Carrera Responsable',
-        'Carreras Hijos': 'Da servicio a:',
-        'Codigo Materia': 'Código',
-        'Nombre Materia': 'Materia',
-        'Objetivo de la materia': 'Objetivo de la Materia',
-        'S': 'S (Específico)',
-        'M': 'M (Medible)',
-        'A': 'A (Alcanzable)',
-        'R': 'R (Relevante)',
-        'T': 'T (Temporal)'
-    })
-
-    for col in ['S (Específico)', 'M (Medible)', 'A (Alcanzable)', 'R (Relevante)', 'T (Temporal)']:
-        html_df[col] = html_df[col].apply(create_icon_for_text)
+    html_df = html_df.rename(columns=REPORT_COLUMNS)
+
+    for col in CRITERIA_COLUMNS:
+        html_df[col] = create_icons_for_column(html_df[col])
     
-    html_df['Objetivo Mejorado'] = html_df['Objetivo Mejorado'].apply(format_output).apply(replace_newlines_for_html)
-    html_df['Objetivo de la Materia'] = html_df['Objetivo de la Materia'].apply(clean_bullets_and_tabs).apply(replace_newlines_for_html)
-    html_df['Da servicio a:'] = html_df['Da servicio a:'].apply(replace_newlines_for_html)
+    html_df['Objetivo Mejorado'] = replace_newlines_for_column(html_df['Objetivo Mejorado'].apply(format_output))
+    html_df['Objetivo de la Materia'] = replace_newlines_for_column(
+        html_df['Objetivo de la Materia'].str.replace('\t', ' ', regex=False)
+    )
+    html_df['Da servicio a:'] = replace_newlines_for_column(html_df['Da servicio a:'])
+    return html_df
+
+# Fingerprint of this module's source, so editing any transform, icon, regex or
+# template it renders rows with invalidates the cached fragments
+def render_version() -> str:
+    return code_fingerprint(sys.modules[__name__])
 
-    html_table = html_df.to_html(index=False, escape=False)
+# One cache key per row, from the raw values of every column the report shows
+def fragment_keys(evaluation_dataframe: pd.DataFrame) -> List[str]:
+    prefix = render_version() + "\x1e" + "\x1f".join(map(str, evaluation_dataframe.columns)) + "\x1e"
+    return [
+        hashlib.sha256((prefix + "\x1f".join(map(str, row))).encode("utf-8")).hexdigest()
+        for row in evaluation_dataframe.to_numpy(dtype=object).tolist()
+    ]
 
-    html_content = f"""
+# Table row in the same layout DataFrame.to_html produces
+def dataframe_row(cells) -> str:
+    body = "".join(f"      <td>{'NaN' if pd.isna(cell) else cell}</td>\n" for cell in cells)
+    return f"    <tr>\n{body}    </tr>\n"
+
+def dataframe_table_head(columns) -> str:
+    head = "".join(f"      <th>{column}</th>\n" for column in columns)
+    return (
+        '<table border="1" class="dataframe">\n'
+        f'  <thead>\n    <tr style="text-align: right;">\n{head}    </tr>\n  </thead>\n'
+        '  <tbody>\n'
+    )
+
+DATAFRAME_TABLE_FOOTER = '  </tbody>\n</table>'
+
+# Rendered table rows for the whole DataFrame. Rows whose content was already
+# rendered by an earlier report are read from the fragment cache, so only new
+# or changed evaluations go through the cell transforms.
+def render_table_rows(evaluation_dataframe: pd.DataFrame, use_cache: bool = True) -> List[str]:
+    keys = fragment_keys(evaluation_dataframe)
+    cache = FragmentCache() if use_cache else None
+    try:
+        fragments = cache.get_many(keys) if cache is not None else {}
+        missing = [position for position, key in enumerate(keys) if key not in fragments]
+        if missing:
+            html_df = prepare_report_df(evaluation_dataframe.iloc[missing])
+            rendered = {
+                keys[position]: dataframe_row(cells)
+                for position, cells in zip(missing, html_df.itertuples(index=False, name=None))
+            }
+            fragments.update(rendered)
+            if cache is not None:
+                cache.put_many(rendered)
+                cache.evict()
+        print(f"Rendered {len(missing)} of {len(keys)} report rows, {len(keys) - len(missing)} from fragment cache")
+        return [fragments[key] for key in keys]
+    finally:
+        if cache is not None:
+            cache.close()
+
+def generate_html_report(evaluation_dataframe: pd.DataFrame, reports_dir: str = None, use_cache: bool = True) -> str:
+    # Define the HTML structure
+    columns = evaluation_dataframe.rename(columns=REPORT_COLUMNS).columns
+    rows = render_table_rows(evaluation_dataframe, use_cache)
+
+    html_header = f"""
     <html>
     <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
         <title>Reporte SMART</title>
-        <style>
-            body {{
-                font-family: "Segoe UI", Tahoma, Geneva, Verdana, sans-serif;
-                background-color: #f9f9f9;
-                margin: 20px 20px 5px 20px;
-            }}
-            h1 {{
-                color: #333;
-            }}
-            .table-container {{
-                height: 90%;
-                overflow-y: auto;
-                overflow-x: auto;
-                background: white;
-                padding: 0;
-                border-radius: 10px;
-                box-shadow: 0 0 10px rgba(0, 0, 0, 0.1);
-            }}
-            table {{
-                border-collapse: separate;
-                border-spacing: 0;
-                width: 100%;
-                border: 1px solid #ddd;
-                border-radius: 10px;
-                min-width: 2400px;
-            }}
-            th, td {{
-                border: 1px solid #ddd;
-                padding: 12px;
-                text-align: left;
-                vertical-align: top;
-                font-size: 14px;
-            }}
-            th {{
-                background-color: #413d83 !important;
-                color: white;
-                font-weight: bold;
-                text-align: center;
-                position: sticky;
-                top: 0;
-                z-index: 1;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f2f2f2;
-            }}
-            b {{
-                color: #333;
-            }}
-
-            @media (max-width: 600px) {{
-                table {{
-                    min-width: 2000px;
-                }}
-            }}
-        </style>
+        <style>{REPORT_STYLE}        </style>
     </head>
     <body>
         <h1>Reporte de Evaluación SMART - UPB</h1>
         <div class="table-container">
-            {html_table}
+            """
+    html_footer = """
         </div>
     </body>
     </html>
     """
 
-    # Create the HTML file
+    # Create the HTML file, rows are written one by one instead of joined in memory
     date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
     file_name = f"Report_{date}.html"
-    reports_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'reports')
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     file_path = os.path.join(reports_dir, file_name)
     with open(file_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
+        f.write(html_header)
+        f.write(dataframe_table_head(columns))
+        f.writelines(rows)
+        f.write(DATAFRAME_TABLE_FOOTER)
+        f.write(html_footer)
     print(f"Generated report: {file_name}")
     return file_path
+
+def page_header(title: str, heading: str, intro: str = "", table_class: str = "dataframe") -> str:
+    return f"""
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>{title}</title>
+        <style>{REPORT_STYLE}            table.summary {{
+                min-width: 0;
+            }}
+        </style>
+    </head>
+    <body>
+        <h1>{heading}</h1>
+        {intro}
+        <div class="table-container">
+            <table class="{table_class}">
+"""
+
+PAGE_FOOTER = """
+            </table>
+        </div>
+    </body>
+    </html>
+"""
+
+def table_head(columns) -> str:
+    cells = "".join(f"<th>{column}</th>" for column in columns)
+    return f"<thead><tr>{cells}</tr></thead>\n<tbody>\n"
+
+def table_row(cells) -> str:
+    return "<tr>" + "".join(f"<td>{'' if pd.isna(cell) else cell}</td>" for cell in cells) + "</tr>\n"
+
+def career_file_name(career: str, used: set) -> str:
+    ascii_name = unicodedata.normalize("NFKD", str(career)).encode("ascii", "ignore").decode("ascii")
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", ascii_name).strip("_").lower() or "carrera"
+    name = slug
+    counter = 2
+    while name in used:
+        name = f"{slug}_{counter}"
+        counter += 1
+    used.add(name)
+    return f"{name}.html"
+
+# Sí / Parcialmente / No counts per career and criterion, from the first word of each verdict
+def verdict_summary(evaluation_dataframe: pd.DataFrame) -> pd.DataFrame:
+    summary = evaluation_dataframe.groupby('Carrera Padre', sort=True).agg(Total=('Codigo Materia', 'nunique'))
+    for criterion in ['S', 'M', 'A', 'R', 'T']:
+        verdicts = evaluation_dataframe[criterion].fillna("").astype(str).str.split(' ', n=1).str[0]
+        counts = pd.crosstab(evaluation_dataframe['Carrera Padre'], verdicts)
+        for verdict in ['Sí.', 'Parcialmente.', 'No.']:
+            column = counts[verdict] if verdict in counts.columns else 0
+            summary[f"{criterion} {verdict}"] = column
+    return summary.fillna(0)
+
+# One page per Carrera Padre plus an index with summary counts. Each career is
+# rendered and written row by row, so only one career is transformed at a time
+# and the report is never held in memory as a single string.
+def generate_sharded_html_report(evaluation_dataframe: pd.DataFrame, reports_dir: str = None) -> str:
+    date = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    if reports_dir is None:
+        reports_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'reports')
+    report_dir = os.path.join(reports_dir, f"Report_{date}")
+    os.makedirs(report_dir, exist_ok=True)
+
+    summary = verdict_summary(evaluation_dataframe)
+    used_names = set()
+    pages = {}
+
+    for career, career_df in evaluation_dataframe.groupby('Carrera Padre', sort=True):
+        pages[career] = career_file_name(career, used_names)
+        html_df = prepare_report_df(career_df).drop(columns=['Carrera Responsable'])
+        with open(os.path.join(report_dir, pages[career]), "w", encoding="utf-8") as f:
+            f.write(page_header(
+                f"Reporte SMART - {career}",
+                f"Reporte de Evaluación SMART - {career}",
+                f'<p><a href="index.html">&larr; Volver al índice</a> &middot; {len(html_df)} asignaturas</p>'
+            ))
+            f.write(table_head(html_df.columns))
+            for cells in html_df.itertuples(index=False, name=None):
+                f.write(table_row(cells))
+            f.write("</tbody>")
+            f.write(PAGE_FOOTER)
+
+    index_path = os.path.join(report_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(page_header(
+            "Reporte SMART",
+            "Reporte de Evaluación SMART - UPB",
+            f"<p>{int(summary['Total'].sum())} asignaturas en {len(summary)} carreras. "
+            "Cada criterio muestra ✅ Sí / ⚠️ Parcialmente / ❌ No.</p>",
+            table_class="summary"
+        ))
+        f.write(table_head(['Carrera Responsable', 'Asignaturas'] + CRITERIA_COLUMNS))
+        for career, counts in summary.iterrows():
+            cells = [f'<a href="{pages[career]}">{career}</a>', int(counts['Total'])]
+            for criterion in ['S', 'M', 'A', 'R', 'T']:
+                cells.append(
+                    f"✅ {int(counts[f'{criterion} Sí.'])} / "
+                    f"⚠️ {int(counts[f'{criterion} Parcialmente.'])} / "
+                    f"❌ {int(counts[f'{criterion} No.'])}"
+                )
+            f.write(table_row(cells))
+        f.write("</tbody>")
+        f.write(PAGE_FOOTER)
+
+    print(f"Generated sharded report: {report_dir} ({len(pages)} career pages)")
+    return index_path
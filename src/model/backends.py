@@ -0,0 +1,161 @@
+import os
+import asyncio
+from typing import AsyncIterator, List, Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+HF_API_TOKEN = os.getenv("HF_API_TOKEN")
+
+# One streamed piece of a completion, normalized across backends.
+# Backends that see the response headers send them first, for the rate limiter.
+class StreamChunk:
+    def __init__(self, content: Optional[str] = None, finish_reason: Optional[str] = None, usage=None,
+                 headers: Optional[Dict[str, str]] = None):
+        self.content = content
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.headers = headers
+
+# Request failure with the HTTP status and Retry-After hint when the backend gives one
+class BackendError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.headers = headers or {}
+
+def parse_retry_after(headers) -> Optional[float]:
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is not None:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+# Interface the engine loop drives; clients are created lazily, never at import time
+class LLMBackend:
+    name = "base"
+    # Whether stream_chat honours a JSON-schema response_format (structured outputs)
+    supports_response_format = False
+    # Requests the backend can work on at once, used when no concurrency cap is set; 0 has no preference
+    concurrency_hint = 0
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def stream_chat(self, messages: List[Dict], max_tokens: int, temperature: float,
+                    response_format: Optional[Dict] = None) -> AsyncIterator[StreamChunk]:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+class OpenAIBackend(LLMBackend):
+    name = "openai"
+    supports_response_format = True
+
+    def __init__(self, model: str, api_key: Optional[str] = OPENAI_API_KEY, base_url: Optional[str] = OPENAI_BASE_URL):
+        super().__init__(model)
+        from openai import AsyncOpenAI
+        # The engine owns retries, so the client must not retry behind its back
+        self.client = AsyncOpenAI(api_key=api_key or "not-set", base_url=base_url, max_retries=0)
+
+    async def stream_chat(self, messages, max_tokens, temperature, response_format=None):
+        import openai
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+                response_format=response_format if response_format is not None else openai.NOT_GIVEN,
+            )
+        except openai.APIStatusError as e:
+            headers = dict(e.response.headers) if e.response is not None else {}
+            raise BackendError(str(e), e.status_code, parse_retry_after(headers), headers) from e
+        except openai.APIConnectionError as e:
+            raise BackendError(str(e)) from e
+
+        yield StreamChunk(headers=dict(raw.headers))
+        response = raw.parse()
+        try:
+            async for chunk in response:
+                choice = chunk.choices[0] if chunk.choices else None
+                yield StreamChunk(
+                    content=choice.delta.content if choice is not None and choice.delta else None,
+                    finish_reason=getattr(choice, "finish_reason", None),
+                    usage=getattr(chunk, "usage", None),
+                )
+        finally:
+            await response.close()
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+class HuggingFaceBackend(LLMBackend):
+    name = "huggingface"
+
+    def __init__(self, model: str, token: Optional[str] = HF_API_TOKEN):
+        super().__init__(model)
+        from huggingface_hub import AsyncInferenceClient
+        self.client = AsyncInferenceClient(token=token)
+
+    async def stream_chat(self, messages, max_tokens, temperature, response_format=None):
+        import httpx
+        from huggingface_hub.errors import HfHubHTTPError
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+            )
+        except HfHubHTTPError as e:
+            response = getattr(e, "response", None)
+            headers = dict(response.headers) if response is not None else {}
+            status = response.status_code if response is not None else None
+            raise BackendError(str(e), status, parse_retry_after(headers), headers) from e
+        except (httpx.TransportError, OSError, asyncio.TimeoutError) as e:
+            # Connection failures and timeouts from the underlying HTTP client
+            raise BackendError(str(e)) from e
+
+        async for chunk in stream:
+            choice = chunk.choices[0] if chunk.choices else None
+            yield StreamChunk(
+                content=choice.delta.content if choice is not None and choice.delta else None,
+                finish_reason=getattr(choice, "finish_reason", None),
+                usage=getattr(chunk, "usage", None),
+            )
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+def create_backend(name: str, model: str) -> LLMBackend:
+    name = name.lower()
+    if name == "openai":
+        return OpenAIBackend(model)
+    if name in ("hf", "huggingface"):
+        return HuggingFaceBackend(model)
+    if name == "mock":
+        from src.model.mock_llm import MockBackend
+        return MockBackend(model)
+    if name == "local":
+        from src.model.local_inference import LocalBackend
+        return LocalBackend(model)
+    raise ValueError(f"Unknown LLM backend: {name}")
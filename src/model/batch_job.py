@@ -0,0 +1,240 @@
+import os
+import io
+import json
+import time
+import asyncio
+import logging
+from types import SimpleNamespace
+from typing import Callable, List, Dict, Optional
+from dotenv import load_dotenv
+
+from src.model.backends import OpenAIBackend
+from src.model.batch_packer import pack_batches, bisect_batch
+from src.model.engine import EvaluationEngine
+from src.model.evaluation_cache import prompt_version
+from src.model.result_store import ResultStore
+from src.model.telemetry import MetricsRecorder, RequestTrace
+
+# Load environment variables
+load_dotenv()
+BATCH_JOB_STATE_PATH = os.getenv("BATCH_JOB_STATE_PATH", "./data/batch_job.json")
+BATCH_POLL_INTERVAL_S = float(os.getenv("BATCH_POLL_INTERVAL_S", 30))
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINISHED_STATUSES = {"completed", "expired", "cancelled"}
+
+logger = logging.getLogger(__name__)
+
+# The request lines of one batch job, one chat completion per packed batch of codes
+def build_batch_requests(batches: List[List[str]], items_by_code: Dict[str, Dict],
+                         build_messages: Callable[[List[Dict]], List[Dict]],
+                         model: str, max_tokens: int, temperature: float,
+                         response_format: Optional[Dict] = None) -> Dict[str, Dict]:
+    requests = {}
+    for number, codes in enumerate(batches):
+        requests[f"request-{number}"] = {
+            "custom_id": f"request-{number}",
+            "method": "POST",
+            "url": BATCH_ENDPOINT,
+            "body": {
+                "model": model,
+                "messages": build_messages([items_by_code[code] for code in codes]),
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            },
+        }
+        if response_format is not None:
+            requests[f"request-{number}"]["body"]["response_format"] = response_format
+    return requests
+
+def to_jsonl(lines: List[Dict]) -> bytes:
+    return "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode("utf-8")
+
+# Usage dicts from the output file, read like the streamed usage objects
+def usage_object(usage: Optional[Dict]):
+    if not usage:
+        return None
+    details = usage.get("prompt_tokens_details")
+    return SimpleNamespace(**{**usage, "prompt_tokens_details": SimpleNamespace(**details) if details else None})
+
+# Evaluates pending objectives through the OpenAI Batch API instead of streaming
+# chat completions: half the price and outside the per-minute rate limits, at the
+# cost of results arriving within the completion window instead of seconds.
+# The submitted job is saved to a state file, so an interrupted run resumes
+# polling the same job instead of paying for it twice.
+class BatchJobEngine(EvaluationEngine):
+    def __init__(self, *args, state_path: str = BATCH_JOB_STATE_PATH,
+                 poll_interval_s: float = BATCH_POLL_INTERVAL_S, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not isinstance(self.backend, OpenAIBackend):
+            raise ValueError(f"Bulk evaluation needs the openai backend, not '{self.backend.name}'")
+        self.client = self.backend.client
+        self.state_path = state_path
+        self.poll_interval_s = poll_interval_s
+
+    # What a stored job's answers depend on besides the objectives; a job built with
+    # another model, prompt or output format is not resumed. The JSON schema is
+    # fingerprinted, so editing it counts as another format.
+    def job_settings(self) -> Dict[str, str]:
+        return {
+            "model": self.backend.model,
+            "prompt": prompt_version(self.build_messages([])[0]["content"]),
+            "response_format": self.format_name if self.response_format is None else
+                f"{self.format_name}:{prompt_version(json.dumps(self.response_format, sort_keys=True))}",
+        }
+
+    def load_job(self) -> Optional[Dict]:
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save_job(self, job: Dict) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(temporary, self.state_path)
+
+    def clear_job(self) -> None:
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    # Upload the request file and start the job, recording it before anything else can fail
+    async def submit(self, batches: List[List[str]], items_by_code: Dict[str, Dict], attempt: int) -> Dict:
+        requests = build_batch_requests(batches, items_by_code, self.build_messages,
+                                        self.backend.model, self.max_tokens, self.temperature, self.response_format)
+        upload = await self.client.files.create(
+            file=("smart_evaluations.jsonl", io.BytesIO(to_jsonl(list(requests.values()))), "application/jsonl"),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"purpose": "SMART objectives evaluation"},
+        )
+        job = {
+            "batch_id": batch.id,
+            "input_file_id": upload.id,
+            **self.job_settings(),
+            "attempt": attempt,
+            "submitted_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "requests": {custom_id: codes for custom_id, codes in zip(requests, batches)},
+        }
+        self.save_job(job)
+        print(f"Submitted batch job {batch.id} with {len(batches)} requests "
+              f"({sum(len(codes) for codes in batches)} objectives)")
+        return job
+
+    async def wait(self, batch_id: str):
+        last_status = None
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            counts = batch.request_counts
+            status = f"{batch.status} ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else batch.status
+            if status != last_status:
+                print(f"Batch job {batch_id}: {status}")
+                last_status = status
+            if batch.status == "failed":
+                self.clear_job()
+                errors = "; ".join(error.message or "" for error in (batch.errors.data or [])) if batch.errors else ""
+                raise RuntimeError(f"Batch job {batch_id} failed: {errors or 'no details'}")
+            if batch.status in FINISHED_STATUSES:
+                return batch
+            await asyncio.sleep(self.poll_interval_s)
+
+    async def read_lines(self, file_id: Optional[str]) -> List[Dict]:
+        if not file_id:
+            return []
+        content = await self.client.files.content(file_id)
+        return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+    # Wait for the job and parse its output; returns (codes, completed, truncated) per request
+    async def collect(self, job: Dict, store: ResultStore, settled: Dict[str, Dict[str, str]],
+                      metrics: MetricsRecorder, started: float):
+        batch = await self.wait(job["batch_id"])
+        lines = await self.read_lines(batch.output_file_id) + await self.read_lines(batch.error_file_id)
+        by_id = {line.get("custom_id"): line for line in lines}
+
+        outcomes = []
+        for custom_id, codes in job["requests"].items():
+            line = by_id.get(custom_id) or {"error": {"message": f"no result ({batch.status})"}}
+            response = line.get("response") or {}
+            body = response.get("body") or {}
+            trace = RequestTrace(len(codes), job["attempt"], self.format_name)
+            trace.started = started
+            completed = []
+            parser = self.response_parser(codes, store, settled, completed)
+            error, truncated = None, False
+
+            if response.get("status_code") == 200 and body.get("choices"):
+                choice = body["choices"][0]
+                text = (choice.get("message") or {}).get("content") or ""
+                logger.debug("--- Raw model response (%s) ---\n%s\n--- End of raw response ---", custom_id, text)
+                trace.set_usage(usage_object(body.get("usage")))
+                truncated = choice.get("finish_reason") == "length"
+                parser.feed(text)
+                parser.close(flush=not truncated)
+                truncated = truncated or parser.aborted
+            else:
+                failure = line.get("error") or body.get("error") or {}
+                error = failure.get("message") or f"status {response.get('status_code')}"
+
+            trace.finish(len(completed), truncated, error)
+            metrics.record(trace)
+            outcomes.append((codes, completed, truncated))
+        return outcomes
+
+    # One batch job per round; what is still missing afterwards goes into the next
+    # job, split in half when its request failed or was truncated, like the streaming path
+    async def evaluate_pending(self, pending_codes: List[str], items_by_code: Dict[str, Dict], store: ResultStore,
+                               settled: Dict[str, Dict[str, str]], metrics: MetricsRecorder, max_retries: int,
+                               max_concurrency: int, on_completed: Callable[[List[str]], None]) -> None:
+        retry_tracker = {code: 0 for code in pending_codes}
+        job = self.load_job()
+        job_codes = set()
+        if job is not None:
+            job_codes = {code for codes in job["requests"].values() for code in codes} & set(retry_tracker)
+            if all(job.get(key) == value for key, value in self.job_settings().items()) and job_codes:
+                print(f"Resuming batch job {job['batch_id']} submitted at {job['submitted_at']}")
+                for code in job_codes:
+                    retry_tracker[code] = job["attempt"]
+            else:
+                print(f"Discarding batch job {job['batch_id']}, it does not match the pending objectives, "
+                      "model, prompt or response format")
+                job, job_codes = None, set()
+
+        batches = pack_batches([code for code in pending_codes if code not in job_codes], items_by_code,
+                               output_budget=self.output_budget)
+        while job is not None or batches:
+            started = time.perf_counter()
+            if job is None:
+                job = await self.submit(batches, items_by_code, max(retry_tracker[code] for codes in batches for code in codes))
+                batches = []
+
+            next_batches = []
+            for codes, completed, truncated in await self.collect(job, store, settled, metrics, started):
+                # A resumed job may hold codes settled since, e.g. by the cache
+                codes = [code for code in codes if code in retry_tracker]
+                completed = [code for code in completed if code in retry_tracker]
+                for code in codes:
+                    retry_tracker[code] += 1
+                missing = [code for code in codes if store.get(code) is None and retry_tracker[code] < max_retries]
+                if not completed or truncated:
+                    next_batches.extend(bisect_batch(missing))
+                elif missing:
+                    next_batches.append(missing)
+                if completed:
+                    on_completed(completed)
+
+            self.clear_job()
+            job = None
+            batches.extend(next_batches)
+            print(f"\nRemaining objectives to process: {sum(len(codes) for codes in batches)}")
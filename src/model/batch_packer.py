@@ -0,0 +1,83 @@
+import os
+from typing import List, Dict
+from dotenv import load_dotenv
+
+from src.model.rule_engine import criteria_to_evaluate
+
+# Load environment variables
+load_dotenv()
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 20))
+INPUT_TOKEN_BUDGET = int(os.getenv("INPUT_TOKEN_BUDGET", 6000))
+OUTPUT_TOKEN_BUDGET = int(os.getenv("OUTPUT_TOKEN_BUDGET", 3200))
+
+# Share of a request's max_tokens the packer fills, leaving room for estimates that run short
+OUTPUT_BUDGET_MARGIN = 0.8
+
+# Rough tokenizer-free estimates, Spanish text averages about 3.5 characters per token
+CHARS_PER_TOKEN = 3.5
+# Each criterion explanation costs about the same for every objective, plus the labels
+OUTPUT_TOKENS_PER_CRITERION = 60
+OUTPUT_TOKENS_PER_BLOCK = 50
+# The improved objective restates the original and may append suggestions
+OUTPUT_TOKENS_PER_INPUT_TOKEN = 1.5
+
+def estimate_tokens(text: str) -> int:
+    return int(len(str(text)) / CHARS_PER_TOKEN) + 1
+
+def estimate_input_tokens(item: Dict) -> int:
+    codigo = str(item.get("Codigo Materia", "")).strip()
+    objetivo = str(item.get("Objetivo de la materia", "")).strip()
+    return estimate_tokens(f"Código: {codigo}\nObjetivo: {objetivo}\n\n")
+
+def estimate_output_tokens(item: Dict) -> int:
+    objetivo = str(item.get("Objetivo de la materia", "")).strip()
+    return (
+        OUTPUT_TOKENS_PER_BLOCK
+        + OUTPUT_TOKENS_PER_CRITERION * len(criteria_to_evaluate(item))
+        + int(estimate_tokens(objetivo) * OUTPUT_TOKENS_PER_INPUT_TOKEN)
+    )
+
+# Greedily fill each request up to the input and output token budgets, keeping order.
+# An objective that exceeds a budget on its own is sent alone.
+def pack_batches(codes: List[str], items_by_code: Dict[str, Dict],
+                 input_budget: int = INPUT_TOKEN_BUDGET,
+                 output_budget: int = OUTPUT_TOKEN_BUDGET,
+                 max_items: int = BATCH_SIZE) -> List[List[str]]:
+    batches = []
+    current = []
+    input_tokens = 0
+    output_tokens = 0
+
+    for code in codes:
+        item = items_by_code[code]
+        item_input = estimate_input_tokens(item)
+        item_output = estimate_output_tokens(item)
+
+        if current and (
+            len(current) >= max_items
+            or input_tokens + item_input > input_budget
+            or output_tokens + item_output > output_budget
+        ):
+            batches.append(current)
+            current = []
+            input_tokens = 0
+            output_tokens = 0
+
+        current.append(code)
+        input_tokens += item_input
+        output_tokens += item_output
+
+    if current:
+        batches.append(current)
+    return batches
+
+# Output budget for an engine answering with at most max_tokens per request
+def output_budget_for(max_tokens: int, budget: int = OUTPUT_TOKEN_BUDGET) -> int:
+    return max(1, min(budget, int(max_tokens * OUTPUT_BUDGET_MARGIN)))
+
+# Split a failed or truncated batch in half so each half fits more easily
+def bisect_batch(codes: List[str]) -> List[List[str]]:
+    if len(codes) <= 1:
+        return [codes] if codes else []
+    middle = len(codes) // 2
+    return [codes[:middle], codes[middle:]]
@@ -0,0 +1,51 @@
+import os
+import json
+from typing import List, Dict
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+CHECKPOINT_JOURNAL_PATH = os.getenv("CHECKPOINT_JOURNAL_PATH", "./data/checkpoint.jsonl")
+
+# Append-only JSONL journal of parsed evaluations, one line per course code
+class CheckpointJournal:
+    def __init__(self, path: str = CHECKPOINT_JOURNAL_PATH, resume: bool = False):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A fresh run starts a new journal, resume keeps what is already there
+        self.file = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self.file.tell() > 0:
+            # Terminate a torn last line so new records start on their own line
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")
+
+    # Write a whole batch in one call and force it to disk before returning
+    def append(self, records: List[Dict[str, str]]) -> None:
+        if not records:
+            return
+        lines = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        self.file.write(lines)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    # Latest journaled result per code; a torn last line from a crash is ignored
+    def replay(self) -> Dict[str, Dict[str, str]]:
+        recovered = {}
+        if not os.path.exists(self.path):
+            return recovered
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and record.get("Código"):
+                    recovered[record["Código"]] = record
+        return recovered
+
+    def close(self) -> None:
+        self.file.close()
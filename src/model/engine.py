@@ -0,0 +1,312 @@
+import os
+import asyncio
+import logging
+from typing import Callable, List, Dict, Optional
+from dotenv import load_dotenv
+
+from src.data.storage import save_frame
+from src.model.backends import LLMBackend
+from src.model.batch_packer import (
+    BATCH_SIZE, estimate_output_tokens, estimate_tokens, output_budget_for, pack_batches, bisect_batch
+)
+from src.model.checkpoint import CHECKPOINT_JOURNAL_PATH, CheckpointJournal
+from src.model.evaluation_cache import EvaluationCache, make_cache_key, normalize_objective, prompt_version
+from src.model.rate_limiter import RateLimitScheduler
+from src.model.result_store import ResultStore, normalize_code
+from src.model.rule_engine import CRITERIA_TO_EVALUATE, RULES_COLUMN, criteria_to_evaluate, prescreen, rule_verdicts
+from src.model.stream_parser import StreamingJsonParser, StreamingResponseParser
+from src.model.structured_output import parse_evaluation
+from src.model.telemetry import METRICS_PATH, MetricsRecorder, RequestTrace
+
+# Load environment variables
+load_dotenv()
+# 0 lets the backend choose (the local pool's capacity, 4 for the API backends); any other value is a hard cap
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", 0))
+DEFAULT_CONCURRENCY = 4
+DEDUPLICATE_OBJECTIVES = os.getenv("DEDUPLICATE_OBJECTIVES", "true").lower() in ("1", "true", "yes")
+
+logger = logging.getLogger(__name__)
+
+# Objectives that only differ in whitespace or case are evaluated once
+def dedup_key(objective) -> str:
+    return normalize_objective(objective).lower()
+
+# Drives batching, retries, checkpointing and caching for any LLM backend.
+# The prompt engines supply the backend, their prompt and their response parser.
+class EvaluationEngine:
+    def __init__(self, backend: LLMBackend,
+                 build_messages: Callable[[List[Dict]], List[Dict]],
+                 parse_response: Callable[[str], Dict[str, str]],
+                 max_tokens: int, temperature: float, scheduler: Optional[RateLimitScheduler] = None,
+                 response_format: Optional[Dict] = None):
+        self.backend = backend
+        self.build_messages = build_messages
+        self.parse_response = parse_response
+        self.max_tokens = max_tokens
+        # Batches are packed to fit the answer into max_tokens, not only the configured budget
+        self.output_budget = output_budget_for(max_tokens)
+        self.temperature = temperature
+        self.scheduler = scheduler or RateLimitScheduler()
+        # JSON schema for structured outputs; None keeps the free-text format and parse_response
+        self.response_format = response_format
+        self.format_name = "json" if response_format is not None else "text"
+
+    # Stream one batch through the API, holding a concurrency slot while in flight.
+    # Chunks are fed to the parser so finished blocks are committed as they arrive.
+    # Returns the raw text and whether the model stopped at the token limit.
+    async def evaluate_batch(self, batch: List[Dict], semaphore: asyncio.Semaphore, parser: StreamingResponseParser, trace: RequestTrace):
+        messages = self.build_messages(batch)
+
+        # Rate limiter budget: prompt plus the expected answer, corrected with the real usage afterwards
+        estimated_tokens = (
+            estimate_tokens("".join(message["content"] for message in messages))
+            + sum(estimate_output_tokens(item) for item in batch)
+        )
+
+        async with semaphore:
+            logger.debug("--- NEW BATCH with %d objectives ---", len(batch))
+            for msg in messages:
+                logger.debug("%s:\n%s", msg['role'].upper(), msg['content'])
+
+            response_parts = []
+            truncated = False
+            stream, first_chunk = await self.scheduler.open_stream(
+                lambda: self.backend.stream_chat(messages, self.max_tokens, self.temperature, self.response_format),
+                estimated_tokens,
+                on_attempt=trace.start,
+            )
+
+            async def chunks():
+                if first_chunk is not None:
+                    yield first_chunk
+                    async for chunk in stream:
+                        yield chunk
+
+            chunk_iter = chunks()
+            try:
+                async for chunk in chunk_iter:
+                    if chunk.headers is not None:
+                        self.scheduler.update_from_headers(chunk.headers)
+                    if chunk.usage is not None:
+                        trace.set_usage(chunk.usage)
+                    if chunk.finish_reason == "length":
+                        truncated = True
+                    if chunk.content:
+                        trace.mark_first_token()
+                        response_parts.append(chunk.content)
+                        if not parser.feed(chunk.content):
+                            print("Response stopped following the format. Aborting stream...")
+                            break
+            finally:
+                await chunk_iter.aclose()
+                await stream.aclose()
+            self.scheduler.record_usage(estimated_tokens, trace.prompt_tokens + trace.completion_tokens)
+
+        # The last block of a response cut off at max_tokens is incomplete, keep its code missing
+        parser.close(flush=not truncated)
+        return "".join(response_parts).strip(), truncated
+
+    # Parser handing each finished block to the store and collecting its code in
+    # completed; blocks for codes outside the batch count as bad
+    def response_parser(self, batch_codes: List[str], store: ResultStore, settled: Dict[str, Dict[str, str]],
+                        completed: List[str]):
+        expected = set(batch_codes)
+
+        def commit_block(parsed: Dict[str, str]) -> bool:
+            code = normalize_code(parsed["Código"])
+            if code not in expected:
+                return False
+            # Criteria settled by rules were not asked, fill them in before the completeness check
+            code = store.add({**parsed, **settled.get(code, {})})
+            if code is None:
+                return False
+            completed.append(code)
+            return True
+
+        if self.response_format is not None:
+            return StreamingJsonParser(parse_evaluation, commit_block)
+        return StreamingResponseParser(self.parse_response, commit_block)
+
+    async def _evaluate_code_batch(self, batch_codes: List[str], items_by_code: Dict[str, Dict], store: ResultStore,
+                                  semaphore: asyncio.Semaphore, metrics: MetricsRecorder, attempt: int,
+                                  settled: Dict[str, Dict[str, str]]):
+        batch = [items_by_code[code] for code in batch_codes]
+        completed = []
+        parser = self.response_parser(batch_codes, store, settled, completed)
+        trace = RequestTrace(len(batch_codes), attempt, self.format_name)
+        error = None
+        try:
+            full_response, truncated = await self.evaluate_batch(batch, semaphore, parser, trace)
+        except Exception as e:
+            print(f"Batch request failed: {e}")
+            full_response, truncated, error = "", False, str(e)
+        trace.finish(len(completed), truncated or parser.aborted, error)
+        metrics.record(trace)
+        return batch_codes, full_response, completed, truncated or parser.aborted
+
+    # Evaluate the pending codes with streamed requests, re-queueing what is still
+    # missing. on_completed receives the codes of every batch as it is merged.
+    async def evaluate_pending(self, pending_codes: List[str], items_by_code: Dict[str, Dict], store: ResultStore,
+                               settled: Dict[str, Dict[str, str]], metrics: MetricsRecorder, max_retries: int,
+                               max_concurrency: int, on_completed: Callable[[List[str]], None]) -> None:
+        retry_tracker = {code: 0 for code in pending_codes}
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        batches = pack_batches(pending_codes, items_by_code, output_budget=self.output_budget)
+
+        while batches:
+            tasks = [
+                asyncio.create_task(self._evaluate_code_batch(
+                    batch_codes, items_by_code, store, semaphore, metrics,
+                    max(retry_tracker[code] for code in batch_codes), settled
+                ))
+                for batch_codes in batches
+            ]
+            next_batches = []
+
+            for finished in asyncio.as_completed(tasks):
+                current_batch_codes, full_response, completed, truncated = await finished
+
+                for code in current_batch_codes:
+                    retry_tracker[code] += 1
+
+                logger.debug("--- Raw model response ---\n%s\n--- End of raw response ---", full_response)
+
+                # Re-queue only the codes that are still missing; a failed or truncated
+                # batch is split in half instead of being resent unchanged
+                missing = [
+                    code for code in current_batch_codes
+                    if store.get(code) is None and retry_tracker[code] < max_retries
+                ]
+                if not completed or truncated:
+                    print(f"Batch failed or was truncated. Retrying {len(missing)} objectives in smaller batches...\n")
+                    next_batches.extend(bisect_batch(missing))
+                elif missing:
+                    print(f"Salvaged {len(completed)} of {len(current_batch_codes)} objectives from batch")
+                    next_batches.append(missing)
+
+                if completed:
+                    on_completed(completed)
+
+            batches = next_batches
+            print(f"\nRemaining objectives to process: {sum(len(batch) for batch in batches)}")
+
+    # Screen, deduplicate and serve cached objectives, then evaluate the rest and merge the results
+    async def run(self, df, max_retries=5, save_path=None, max_concurrency=MAX_CONCURRENCY, use_cache=True, resume=False,
+                  use_rules=True, deduplicate=DEDUPLICATE_OBJECTIVES, checkpoint_path=CHECKPOINT_JOURNAL_PATH,
+                  metrics_path=METRICS_PATH):
+        items_by_code = {}
+        settled = {}
+        screened = prescreen(df) if use_rules else None
+        records = df.to_dict(orient='records')
+        screened_records = screened.to_dict(orient='records') if use_rules else [{}] * len(records)
+        for item, screened_row in zip(records, screened_records):
+            code = normalize_code(item.get("Codigo Materia", ""))
+            if code in items_by_code:
+                continue
+            items_by_code[code] = item
+            if use_rules:
+                # Only the criteria that need judgement are sent to the model
+                item[CRITERIA_TO_EVALUATE] = screened_row[CRITERIA_TO_EVALUATE]
+                settled[code] = rule_verdicts(screened_row)
+        store = ResultStore(items_by_code.keys())
+
+        # Group codes sharing the same objective text, the first code of a group is evaluated
+        groups = {}
+        for code, item in items_by_code.items():
+            key = dedup_key(item.get("Objetivo de la materia", "")) if deduplicate else code
+            groups.setdefault(key, []).append(code)
+        group_of = {code: group for group in groups.values() for code in group}
+
+        # Copy a code's result to every other code of its group, returns the codes filled
+        def fan_out(code: str) -> List[str]:
+            result = store.get(code)
+            filled = []
+            for sibling in group_of[code]:
+                if store.get(sibling) is None and store.add({**result, "Código": sibling}) is not None:
+                    filled.append(sibling)
+            return filled
+
+        print(f"Total objectives to process: {len(items_by_code)}")
+        if deduplicate and items_by_code:
+            saved = len(items_by_code) - len(groups)
+            print(
+                f"Deduplicated into {len(groups)} unique objective texts "
+                f"(dedup ratio {saved / len(items_by_code):.1%}, {saved} evaluations saved)"
+            )
+        print(f"Max objectives per batch: {BATCH_SIZE}, output token budget: {self.output_budget} (max_tokens {self.max_tokens})")
+        if not max_concurrency:
+            max_concurrency = self.backend.concurrency_hint or DEFAULT_CONCURRENCY
+        print(f"Backend: {self.backend.name} ({self.backend.model}), max concurrent batches: {max_concurrency}"
+              + (f" (capped, the backend could take {self.backend.concurrency_hint})"
+                 if self.backend.concurrency_hint > max_concurrency else ""))
+        if use_rules:
+            print(
+                f"Rule pre-screening settled {sum(len(v) for v in settled.values())} criteria, "
+                f"{int(screened['Ruta completa'].sum())} objectives take the full path"
+            )
+
+        # Replay the journal of an interrupted run and only schedule missing codes
+        journal = CheckpointJournal(checkpoint_path, resume=resume)
+        if resume:
+            for journaled in journal.replay().values():
+                store.add(journaled)
+            print(f"Resumed {len(store)} objectives from {journal.path}")
+
+        # Serve unchanged objectives from the local cache and only send misses
+        cache = EvaluationCache() if use_cache else None
+        cache_keys = {}
+        if cache is not None:
+            version = prompt_version(self.build_messages([])[0]["content"])
+            for code in store.missing():
+                if group_of[code][0] != code:
+                    continue
+                item = items_by_code[code]
+                screening = f"rules:{','.join(criteria_to_evaluate(item))}" if use_rules else "no-rules"
+                cache_keys[code] = make_cache_key(item.get("Objetivo de la materia", ""), self.backend.model,
+                                                  self.temperature, version, screening)
+                cached = cache.get(cache_keys[code])
+                if cached is not None:
+                    store.add({**cached, "Código": code})
+            print(f"Cache hits: {cache.hits}, misses: {cache.misses}")
+
+        for group in groups.values():
+            evaluated = next((code for code in group if store.get(code) is not None), None)
+            if evaluated is not None:
+                fan_out(evaluated)
+
+        pending_codes = [code for code in store.missing() if group_of[code][0] == code]
+        metrics = MetricsRecorder(metrics_path, scheduler=self.scheduler)
+
+        # Checkpoint progress after each batch (only successful results)
+        def on_completed(completed: List[str]) -> None:
+            fanned_out = [sibling for code in completed for sibling in fan_out(code)]
+            journal.append([store.get(code) for code in completed + fanned_out])
+
+            if cache is not None:
+                for code in completed:
+                    cache.put(cache_keys[code], store.get(code))
+                cache.conn.commit()
+
+        await self.evaluate_pending(pending_codes, items_by_code, store, settled, metrics,
+                                    max_retries, max_concurrency, on_completed)
+
+        journal.close()
+        metrics.close()
+        df = store.merge_into(df)
+        if use_rules:
+            # Record which verdicts came from rules instead of the model
+            df[RULES_COLUMN] = screened[RULES_COLUMN]
+
+        if cache is not None:
+            evicted = cache.evict()
+            stats = cache.stats()
+            print(f"Cache stats: {stats['hits']} hits, {stats['misses']} misses, {evicted} evicted")
+            cache.close()
+
+        print("\nModel processing complete.\n")
+        if 'Carrera Padre' in df.columns:
+            df = df.sort_values(by='Carrera Padre', ascending=True).reset_index(drop=True)
+        if save_path:
+            save_frame(df, save_path)
+            print(f"Results saved to {save_path}")
+        return df
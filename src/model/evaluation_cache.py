@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+EVALUATION_CACHE_PATH = os.getenv("EVALUATION_CACHE_PATH", "./data/evaluation_cache.sqlite")
+EVALUATION_CACHE_MAX_ENTRIES = int(os.getenv("EVALUATION_CACHE_MAX_ENTRIES", 50000))
+EVALUATION_CACHE_MAX_AGE_DAYS = float(os.getenv("EVALUATION_CACHE_MAX_AGE_DAYS", 180))
+
+# Collapse whitespace so reformatted but identical objectives share a cache entry
+def normalize_objective(text: str) -> str:
+    return " ".join(str(text).split())
+
+# Short fingerprint of a system prompt, bumps automatically when the prompt is edited
+def prompt_version(system_prompt: str) -> str:
+    return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+
+# screening describes the rule pre-screen: off, or the criteria left to the model,
+# since rule-settled verdicts are stored alongside the model's
+def make_cache_key(objective: str, model: str, temperature: float, version: str, screening: str = "") -> str:
+    payload = "\x1f".join([normalize_objective(objective), model, repr(float(temperature)), version, screening])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# On-disk SQLite store of parsed evaluations keyed by content hash
+class EvaluationCache:
+    def __init__(self, path: str = EVALUATION_CACHE_PATH,
+                 max_entries: int = EVALUATION_CACHE_MAX_ENTRIES,
+                 max_age_days: float = EVALUATION_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Shard processes share the cache, wait for another writer's commit instead of failing
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS evaluations ("
+            "key TEXT PRIMARY KEY, "
+            "result TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON evaluations(last_access)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT result, created_at FROM evaluations WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.max_age_seconds:
+            self.misses += 1
+            return None
+        self.conn.execute("UPDATE evaluations SET last_access = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, str]) -> None:
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO evaluations (key, result, created_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(result, ensure_ascii=False), now, now)
+        )
+
+    # Drop expired entries, then the least recently used ones above max_entries
+    def evict(self) -> int:
+        cutoff = time.time() - self.max_age_seconds
+        removed = self.conn.execute("DELETE FROM evaluations WHERE created_at < ?", (cutoff,)).rowcount
+        total = self.conn.execute("SELECT COUNT(*) FROM evaluations").fetchone()[0]
+        if total > self.max_entries:
+            removed += self.conn.execute(
+                "DELETE FROM evaluations WHERE key IN ("
+                "SELECT key FROM evaluations ORDER BY last_access ASC LIMIT ?)",
+                (total - self.max_entries,)
+            ).rowcount
+        self.conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
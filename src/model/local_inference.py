@@ -0,0 +1,241 @@
+import os
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import List, Dict, Tuple
+from dotenv import load_dotenv
+
+from src.model.backends import LLMBackend, StreamChunk
+
+# Load environment variables
+load_dotenv()
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH", "./models/mistral-7b-instruct-v0.3.Q4_K_M.gguf")
+# llama_cpp for GGUF files, transformers for model directories, auto picks by path
+LOCAL_RUNTIME = os.getenv("LOCAL_RUNTIME", "auto")
+# 0 sizes the pool to the available cores divided by the threads of each worker
+LOCAL_WORKERS = int(os.getenv("LOCAL_WORKERS", 0))
+LOCAL_THREADS_PER_WORKER = int(os.getenv("LOCAL_THREADS_PER_WORKER", 4))
+LOCAL_GENERATION_BATCH = int(os.getenv("LOCAL_GENERATION_BATCH", 4))
+LOCAL_CONTEXT_TOKENS = int(os.getenv("LOCAL_CONTEXT_TOKENS", 8192))
+
+# (text, finish_reason, prompt_tokens, completion_tokens) of one generated answer
+Generation = Tuple[str, str, int, int]
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def pool_size(workers: int, threads_per_worker: int) -> int:
+    return workers or max(1, available_cores() // max(1, threads_per_worker))
+
+def resolve_runtime(model_path: str, runtime: str) -> str:
+    if runtime != "auto":
+        return runtime
+    return "transformers" if os.path.isdir(model_path) else "llama_cpp"
+
+# Chat templates of some instruct models (Mistral among them) reject a system
+# turn; its instructions then go in front of the first user message instead
+def fold_system_prompt(messages: List[Dict]) -> List[Dict]:
+    system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+    rest = [dict(m) for m in messages if m["role"] != "system"]
+    if system and rest and rest[0]["role"] == "user":
+        rest[0]["content"] = f"{system}\n\n{rest[0]['content']}"
+    return rest
+
+# Quantized GGUF model through the llama.cpp bindings. Prompts of a batch are
+# decoded one after the other; each already holds several objectives.
+class LlamaCppGenerator:
+    def __init__(self, model_path: str, threads: int, context_tokens: int):
+        from llama_cpp import Llama
+        self.llm = Llama(model_path=model_path, n_ctx=context_tokens, n_threads=threads, verbose=False)
+
+    def generate(self, prompts: List[List[Dict]], max_tokens: int, temperature: float) -> List[Generation]:
+        generations = []
+        for messages in prompts:
+            try:
+                output = self.llm.create_chat_completion(messages=messages, max_tokens=max_tokens, temperature=temperature)
+            except ValueError:
+                output = self.llm.create_chat_completion(messages=fold_system_prompt(messages),
+                                                         max_tokens=max_tokens, temperature=temperature)
+            choice = output["choices"][0]
+            usage = output.get("usage") or {}
+            generations.append((choice["message"]["content"] or "", choice.get("finish_reason") or "stop",
+                                usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)))
+        return generations
+
+# Model directory through transformers on CPU, generating the prompts of a batch
+# together (left padded) so the matrix multiplications are shared
+class TransformersGenerator:
+    def __init__(self, model_path: str, threads: int, context_tokens: int):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_path, torch_dtype="auto")
+        self.model.eval()
+        self.context_tokens = context_tokens
+
+    def render(self, messages: List[Dict]) -> str:
+        try:
+            return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        except Exception:
+            return self.tokenizer.apply_chat_template(fold_system_prompt(messages), tokenize=False,
+                                                      add_generation_prompt=True)
+
+    def generate(self, prompts: List[List[Dict]], max_tokens: int, temperature: float) -> List[Generation]:
+        encoded = self.tokenizer(
+            [self.render(messages) for messages in prompts], return_tensors="pt", padding=True,
+            add_special_tokens=False, truncation=True, max_length=max(1, self.context_tokens - max_tokens),
+        )
+        sampling = {"do_sample": True, "temperature": temperature} if temperature > 0 else {"do_sample": False}
+        with self.torch.inference_mode():
+            output = self.model.generate(**encoded, max_new_tokens=max_tokens,
+                                         pad_token_id=self.tokenizer.pad_token_id, **sampling)
+
+        prompt_length = encoded["input_ids"].shape[1]
+        generations = []
+        for row, mask in zip(output[:, prompt_length:], encoded["attention_mask"]):
+            tokens = [token for token in row.tolist() if token != self.tokenizer.pad_token_id]
+            if tokens and tokens[-1] == self.tokenizer.eos_token_id:
+                tokens = tokens[:-1]
+                finish_reason = "stop"
+            else:
+                finish_reason = "length" if len(tokens) >= max_tokens else "stop"
+            generations.append((self.tokenizer.decode(tokens, skip_special_tokens=True), finish_reason,
+                                int(mask.sum()), len(tokens)))
+        return generations
+
+# Deterministic answers from the mock renderer, to exercise the pool without model weights.
+# Sleeps MOCK_LATENCY_S per generation batch, standing in for the shared forward passes.
+class MockGenerator:
+    def __init__(self, model_path: str, threads: int, context_tokens: int):
+        from src.model.mock_llm import MockConfig
+        self.latency_s = MockConfig().latency_s
+
+    def generate(self, prompts: List[List[Dict]], max_tokens: int, temperature: float) -> List[Generation]:
+        from src.model.mock_llm import estimate_tokens, prompt_tokens, render_limited
+        time.sleep(self.latency_s)
+        generations = []
+        for messages in prompts:
+            text, finish_reason = render_limited(messages, max_tokens)
+            generations.append((text, finish_reason, prompt_tokens(messages), estimate_tokens(text)))
+        return generations
+
+GENERATORS = {"llama_cpp": LlamaCppGenerator, "transformers": TransformersGenerator, "mock": MockGenerator}
+
+# The model of each worker process, loaded once by the pool initializer
+_generator = None
+
+def _load_generator(runtime: str, model_path: str, threads: int, context_tokens: int) -> None:
+    global _generator
+    _generator = GENERATORS[runtime](model_path, threads, context_tokens)
+
+def _generate(prompts: List[List[Dict]], max_tokens: int, temperature: float) -> List[Generation]:
+    return _generator.generate(prompts, max_tokens, temperature)
+
+# Offline backend running a local instruct model in a pool of worker processes,
+# one model copy per process. Requests arriving while every worker is busy are
+# grouped into generation batches of up to LOCAL_GENERATION_BATCH prompts.
+class LocalBackend(LLMBackend):
+    name = "local"
+
+    def __init__(self, model: str, model_path: str = LOCAL_MODEL_PATH, runtime: str = LOCAL_RUNTIME,
+                 workers: int = LOCAL_WORKERS, threads_per_worker: int = LOCAL_THREADS_PER_WORKER,
+                 generation_batch: int = LOCAL_GENERATION_BATCH, context_tokens: int = LOCAL_CONTEXT_TOKENS):
+        runtime = resolve_runtime(model_path, runtime)
+        if runtime not in GENERATORS:
+            raise ValueError(f"Unknown local runtime '{runtime}', choose from {', '.join(GENERATORS)}")
+        if runtime != "mock" and not os.path.exists(model_path):
+            raise FileNotFoundError(f"Local model not found at {model_path}, set LOCAL_MODEL_PATH")
+        # Results are cached per model, so name the weights actually answering
+        super().__init__(f"mock-{model}" if runtime == "mock" else os.path.basename(os.path.normpath(model_path)))
+        self.runtime = runtime
+        self.workers = pool_size(workers, threads_per_worker)
+        self.generation_batch = max(1, generation_batch)
+        threads = max(1, min(threads_per_worker, available_cores()))
+        # Spawned workers: forking a process that runs an event loop and BLAS threads is unsafe
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_generator,
+            initargs=(runtime, model_path, threads, context_tokens),
+        )
+        self.queue = None
+        self.dispatcher = None
+        self.stats = {"prompts": 0, "generation_batches": 0, "completion_tokens": 0, "busy_s": 0.0}
+        self.started = time.perf_counter()
+
+    @property
+    def concurrency_hint(self) -> int:
+        return self.workers * self.generation_batch
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers)
+
+        async def run_group(group):
+            started = time.perf_counter()
+            try:
+                messages, max_tokens, temperature, _ = group[0]
+                generations = await loop.run_in_executor(
+                    self.executor, _generate, [request[0] for request in group], max_tokens, temperature
+                )
+            except Exception as e:
+                for request in group:
+                    if not request[3].done():
+                        request[3].set_exception(e)
+                return
+            finally:
+                slots.release()
+            self.stats["generation_batches"] += 1
+            self.stats["prompts"] += len(group)
+            self.stats["busy_s"] += time.perf_counter() - started
+            for request, generation in zip(group, generations):
+                self.stats["completion_tokens"] += generation[3]
+                if not request[3].done():
+                    request[3].set_result(generation)
+
+        while True:
+            # Only take requests off the queue once a worker is free, so they pile up into batches
+            await slots.acquire()
+            group = [await self.queue.get()]
+            while len(group) < self.generation_batch and not self.queue.empty():
+                request = self.queue.get_nowait()
+                if request[1:3] != group[0][1:3]:
+                    # Different generation settings go into their own batch
+                    self.queue.put_nowait(request)
+                    break
+                group.append(request)
+            asyncio.create_task(run_group(group))
+
+    async def stream_chat(self, messages, max_tokens, temperature, response_format=None):
+        if self.dispatcher is None:
+            self.queue = asyncio.Queue()
+            self.dispatcher = asyncio.create_task(self._dispatch())
+        result = asyncio.get_running_loop().create_future()
+        await self.queue.put((messages, max_tokens, temperature, result))
+        text, finish_reason, prompt_tokens, completion_tokens = await result
+
+        yield StreamChunk(content=text)
+        yield StreamChunk(finish_reason=finish_reason)
+        yield StreamChunk(usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                                prompt_tokens_details=None))
+
+    async def aclose(self) -> None:
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+        if self.stats["prompts"]:
+            elapsed = time.perf_counter() - self.started
+            print(
+                f"Local inference ({self.runtime}, {self.workers} workers): {self.stats['prompts']} prompts in "
+                f"{self.stats['generation_batches']} generation batches, "
+                f"{self.stats['completion_tokens'] / elapsed:.1f} completion tokens/s"
+            )
@@ -0,0 +1,466 @@
+import os
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from src.model.backends import LLMBackend, StreamChunk, BackendError
+
+# Load environment variables
+load_dotenv()
+MOCK_LATENCY_S = float(os.getenv("MOCK_LATENCY_S", 0.2))
+MOCK_TOKENS_PER_S = float(os.getenv("MOCK_TOKENS_PER_S", 200))
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", 0.0))
+MOCK_RATE_LIMIT_RATE = float(os.getenv("MOCK_RATE_LIMIT_RATE", 0.0))
+MOCK_RETRY_AFTER_S = float(os.getenv("MOCK_RETRY_AFTER_S", 1.0))
+MOCK_SEED = int(os.getenv("MOCK_SEED", 0))
+# Simulated account quota, 0 disables it
+MOCK_RPM_LIMIT = int(os.getenv("MOCK_RPM_LIMIT", 0))
+MOCK_TPM_LIMIT = int(os.getenv("MOCK_TPM_LIMIT", 0))
+# Seconds a batch job stays in progress before its output file is ready
+MOCK_BATCH_DELAY_S = float(os.getenv("MOCK_BATCH_DELAY_S", 2.0))
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_CHUNK = 8
+VERDICTS = ["Sí", "Parcialmente", "No"]
+
+# Latency, streaming speed and failure rates shared by the in-process and HTTP stand-ins
+class MockConfig:
+    def __init__(self, latency_s: float = MOCK_LATENCY_S, tokens_per_s: float = MOCK_TOKENS_PER_S,
+                 error_rate: float = MOCK_ERROR_RATE, rate_limit_rate: float = MOCK_RATE_LIMIT_RATE,
+                 retry_after_s: float = MOCK_RETRY_AFTER_S, seed: int = MOCK_SEED,
+                 rpm_limit: int = MOCK_RPM_LIMIT, tpm_limit: int = MOCK_TPM_LIMIT,
+                 batch_delay_s: float = MOCK_BATCH_DELAY_S):
+        self.latency_s = latency_s
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.batch_delay_s = batch_delay_s
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        # (time, tokens) of the requests admitted in the last minute
+        self.window = []
+
+    # Decide the outcome of one request: None, 429 or 500
+    def draw_failure(self):
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500
+        return None
+
+    # Enforce the simulated RPM / TPM quota over a sliding minute, like the real API.
+    # Returns the seconds to wait when the request is rejected (None when admitted)
+    # and the x-ratelimit-* headers describing the quota.
+    def admit(self, tokens: int) -> Tuple[Optional[float], Dict[str, str]]:
+        with self.lock:
+            now = time.monotonic()
+            self.window = [(t, n) for t, n in self.window if now - t < 60]
+            used_requests = len(self.window)
+            used_tokens = sum(n for _, n in self.window)
+            over = (
+                (self.rpm_limit and used_requests + 1 > self.rpm_limit)
+                or (self.tpm_limit and used_tokens + tokens > self.tpm_limit)
+            )
+            if not over:
+                self.window.append((now, tokens))
+                used_requests += 1
+                used_tokens += tokens
+            reset = 60 - (now - self.window[0][0]) if self.window else 0.0
+
+        headers = {}
+        if self.rpm_limit:
+            headers["x-ratelimit-limit-requests"] = str(self.rpm_limit)
+            headers["x-ratelimit-remaining-requests"] = str(max(0, self.rpm_limit - used_requests))
+            headers["x-ratelimit-reset-requests"] = f"{reset:.3f}s"
+        if self.tpm_limit:
+            headers["x-ratelimit-limit-tokens"] = str(self.tpm_limit)
+            headers["x-ratelimit-remaining-tokens"] = str(max(0, self.tpm_limit - used_tokens))
+            headers["x-ratelimit-reset-tokens"] = f"{reset:.3f}s"
+        if over:
+            return max(reset, 0.001), headers
+        return None, headers
+
+# (code, objective, criteria to evaluate) for every objective in the prompt
+def extract_objectives(messages: List[Dict]) -> List[Tuple[str, str, str]]:
+    user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+    pattern = re.compile(
+        r"Código:\s*(.+?)\s*\n(?:Criterios a evaluar:\s*(.+?)\s*\n)?Objetivo:\s*([\s\S]*?)(?=\n\nCódigo:|\Z)"
+    )
+    return [
+        (code.strip(), objective.strip(), "".join(c for c in criteria if c in "SMART") or "SMART")
+        for code, criteria, objective in pattern.findall(user)
+    ]
+
+def _verdict(code: str, objective: str, criterion: str) -> str:
+    lowered = objective.lower()
+    if criterion == "S" and "estudiante" in lowered:
+        return "Sí"
+    if criterion == "T" and "al finalizar" in lowered:
+        return "Sí"
+    digest = hashlib.sha256(f"{code}|{criterion}".encode("utf-8")).digest()
+    return VERDICTS[digest[0] % len(VERDICTS)]
+
+# Deterministic evaluations for every objective in the prompt, as (code, verdicts, improved objective)
+def mock_evaluations(messages: List[Dict]) -> List[Tuple[str, Dict[str, str], str]]:
+    evaluations = []
+    for code, objective, criteria in extract_objectives(messages):
+        verdicts = {criterion: _verdict(code, objective, criterion) for criterion in criteria}
+        if all(verdict == "Sí" for verdict in verdicts.values()):
+            improved = "El objetivo es adecuado y no requiere mejoras."
+        else:
+            improved = f"Al finalizar la asignatura, el estudiante podrá {objective}"
+        evaluations.append((code, verdicts, improved))
+    return evaluations
+
+def explanation(code: str, criterion: str) -> str:
+    return f"Evaluación simulada del criterio {criterion} para {code}."
+
+# Correctly formatted evaluation blocks, as text or as the structured JSON object
+def render_mock_response(messages: List[Dict], structured: bool = False) -> str:
+    evaluations = mock_evaluations(messages)
+    if structured:
+        return json.dumps({"evaluaciones": [
+            {
+                "Código": code,
+                **{criterion: ({"veredicto": verdicts[criterion], "explicacion": explanation(code, criterion)}
+                               if criterion in verdicts else None) for criterion in "SMART"},
+                "Objetivo Mejorado": improved,
+            }
+            for code, verdicts, improved in evaluations
+        ]}, ensure_ascii=False)
+
+    blocks = []
+    for code, verdicts, improved in evaluations:
+        lines = [f"Código: {code}"]
+        for criterion, verdict in verdicts.items():
+            lines.append(f"{criterion}: {verdict}. {explanation(code, criterion)}")
+        lines.append(f"Objetivo Mejorado: {improved}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+# Cut the response at max_tokens like a real model would
+def render_limited(messages: List[Dict], max_tokens: int, structured: bool = False) -> Tuple[str, str]:
+    text = render_mock_response(messages, structured)
+    if max_tokens and estimate_tokens(text) > max_tokens:
+        return text[:max_tokens * CHARS_PER_TOKEN], "length"
+    return text, "stop"
+
+# Requests asking for a JSON schema get the structured rendering
+def is_structured(request: Dict) -> bool:
+    return (request.get("response_format") or {}).get("type") == "json_schema"
+
+def split_chunks(text: str) -> List[str]:
+    size = TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class MockUsage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+        self.prompt_tokens_details = None
+
+def prompt_tokens(messages: List[Dict]) -> int:
+    return estimate_tokens("".join(m.get("content", "") for m in messages))
+
+# In-process stand-in for a streaming chat backend, no network needed
+class MockBackend(LLMBackend):
+    name = "mock"
+    supports_response_format = True
+
+    def __init__(self, model: str = "mock", config: MockConfig = None):
+        # Results are cached per model, fake answers must not pass for the real model's
+        super().__init__(model if model.startswith("mock") else f"mock-{model}")
+        self.config = config or MockConfig()
+        self.requests = 0
+
+    async def stream_chat(self, messages, max_tokens, temperature, response_format=None):
+        self.requests += 1
+        await asyncio.sleep(self.config.latency_s)
+        failure = self.config.draw_failure()
+        if failure == 429:
+            raise BackendError("Rate limit reached (mock)", 429, self.config.retry_after_s,
+                               {"retry-after": str(self.config.retry_after_s)})
+        if failure == 500:
+            raise BackendError("Internal server error (mock)", 500)
+
+        text, finish_reason = render_limited(messages, max_tokens, response_format is not None)
+        retry_after, headers = self.config.admit(prompt_tokens(messages) + estimate_tokens(text))
+        if retry_after is not None:
+            headers["retry-after"] = f"{retry_after:.3f}"
+            raise BackendError("Rate limit reached for requests (mock quota)", 429, retry_after, headers)
+        yield StreamChunk(headers=headers)
+        chunk_delay = TOKENS_PER_CHUNK / self.config.tokens_per_s if self.config.tokens_per_s > 0 else 0
+        for piece in split_chunks(text):
+            if chunk_delay:
+                await asyncio.sleep(chunk_delay)
+            yield StreamChunk(content=piece)
+        yield StreamChunk(finish_reason=finish_reason)
+        yield StreamChunk(usage=MockUsage(prompt_tokens(messages), estimate_tokens(text)))
+
+# Files and batch jobs of the /v1/files and /v1/batches stand-in. A job answers
+# every request line like the chat endpoint (including the simulated 429 / 500
+# failures, which land in the error file) once batch_delay_s has passed.
+class MockBatchStore:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict] = {}
+        self.batches: Dict[str, Dict] = {}
+
+    def add_file(self, content: bytes, filename: str, purpose: str) -> Dict:
+        file_id = f"file-mock-{uuid.uuid4().hex[:12]}"
+        with self.lock:
+            self.files[file_id] = {
+                "object": {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                           "filename": filename, "purpose": purpose, "status": "processed"},
+                "content": content,
+            }
+        return self.files[file_id]["object"]
+
+    def create_batch(self, request: Dict) -> Optional[Dict]:
+        input_file = self.files.get(request.get("input_file_id"))
+        if input_file is None:
+            return None
+        lines = [json.loads(line) for line in input_file["content"].decode("utf-8").splitlines() if line.strip()]
+        batch_id = f"batch_mock_{uuid.uuid4().hex[:12]}"
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": request.get("endpoint"), "errors": None,
+            "input_file_id": request["input_file_id"], "completion_window": request.get("completion_window", "24h"),
+            "status": "in_progress", "output_file_id": None, "error_file_id": None,
+            "created_at": int(time.time()), "in_progress_at": int(time.time()), "completed_at": None,
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+            "metadata": request.get("metadata"),
+        }
+        with self.lock:
+            self.batches[batch_id] = batch
+        timer = threading.Timer(self.config.batch_delay_s, self._complete, (batch_id, lines))
+        timer.daemon = True
+        timer.start()
+        return batch
+
+    def _complete(self, batch_id: str, lines: List[Dict]) -> None:
+        outputs, errors = [], []
+        for line in lines:
+            body = line.get("body") or {}
+            messages = body.get("messages", [])
+            failure = self.config.draw_failure()
+            if failure is not None:
+                errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line.get("custom_id"),
+                               "response": {"status_code": failure, "body": {"error": {"message": f"Mock failure {failure}"}}},
+                               "error": None})
+                continue
+            text, finish_reason = render_limited(messages, body.get("max_tokens") or 0, is_structured(body))
+            usage = {"prompt_tokens": prompt_tokens(messages), "completion_tokens": estimate_tokens(text)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            outputs.append({
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line.get("custom_id"),
+                "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": {
+                    "id": f"chatcmpl-mock-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+                    "created": int(time.time()), "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+                    "usage": usage,
+                }},
+                "error": None,
+            })
+
+        def jsonl(rows):
+            return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+        output_file = self.add_file(jsonl(outputs), f"{batch_id}_output.jsonl", "batch_output") if outputs else None
+        error_file = self.add_file(jsonl(errors), f"{batch_id}_error.jsonl", "batch_output") if errors else None
+        with self.lock:
+            self.batches[batch_id].update({
+                "status": "completed", "completed_at": int(time.time()),
+                "output_file_id": output_file["id"] if output_file else None,
+                "error_file_id": error_file["id"] if error_file else None,
+                "request_counts": {"total": len(lines), "completed": len(outputs), "failed": len(errors)},
+            })
+
+# OpenAI-compatible /v1/chat/completions, /v1/files and /v1/batches stand-in for end-to-end runs over HTTP
+class MockChatHandler(BaseHTTPRequestHandler):
+    config = MockConfig()
+    batch_store: MockBatchStore = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"message": "Not found"}})
+
+    def _upload_file(self, body: bytes):
+        # Multipart form with the "file" and "purpose" fields, parsed as a MIME message
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("latin-1") + body
+        )
+        fields = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            fields[name] = (part.get_filename(), part.get_payload(decode=True))
+        if "file" not in fields:
+            self._send_json(400, {"error": {"message": "Missing file"}})
+            return
+        purpose = (fields.get("purpose") or (None, b"batch"))[1].decode("utf-8")
+        self._send_json(200, self.batch_store.add_file(fields["file"][1], fields["file"][0] or "upload.jsonl", purpose))
+
+    def do_GET(self):
+        path = self.path.split("?")[0].rstrip("/")
+        parts = path.split("/")
+        if len(parts) >= 2 and parts[-2] == "batches":
+            batch = self.batch_store.batches.get(parts[-1])
+            if batch is None:
+                return self._not_found()
+            with self.batch_store.lock:
+                self._send_json(200, dict(batch))
+            return
+        if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+            stored = self.batch_store.files.get(parts[-2])
+            if stored is None:
+                return self._not_found()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(stored["content"])))
+            self.end_headers()
+            self.wfile.write(stored["content"])
+            return
+        self._not_found()
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if path.endswith("/files"):
+            return self._upload_file(body)
+        if path.endswith("/batches"):
+            batch = self.batch_store.create_batch(json.loads(body or b"{}"))
+            if batch is None:
+                self._send_json(400, {"error": {"message": "Unknown input_file_id"}})
+            else:
+                self._send_json(200, batch)
+            return
+        if not path.endswith("/chat/completions"):
+            return self._not_found()
+        request = json.loads(body or b"{}")
+        messages = request.get("messages", [])
+
+        time.sleep(self.config.latency_s)
+        failure = self.config.draw_failure()
+        if failure == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                            {"Retry-After": str(self.config.retry_after_s)})
+            return
+        if failure == 500:
+            self._send_json(500, {"error": {"message": "Internal server error (mock)"}})
+            return
+
+        text, finish_reason = render_limited(messages, request.get("max_tokens") or 0, is_structured(request))
+        usage = {"prompt_tokens": prompt_tokens(messages), "completion_tokens": estimate_tokens(text)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        retry_after, quota_headers = self.config.admit(usage["total_tokens"])
+        if retry_after is not None:
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock quota)", "type": "rate_limit_error"}},
+                            {**quota_headers, "Retry-After": f"{retry_after:.3f}"})
+            return
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", "mock")
+
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+                "usage": usage,
+            }, quota_headers)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        for key, value in quota_headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        def send_event(payload):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def chunk(delta, finish=None):
+            return {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+        chunk_delay = TOKENS_PER_CHUNK / self.config.tokens_per_s if self.config.tokens_per_s > 0 else 0
+        try:
+            send_event(chunk({"role": "assistant", "content": ""}))
+            for piece in split_chunks(text):
+                if chunk_delay:
+                    time.sleep(chunk_delay)
+                send_event(chunk({"content": piece}))
+            send_event(chunk({}, finish_reason))
+            if (request.get("stream_options") or {}).get("include_usage"):
+                send_event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": model, "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client aborted the stream early
+            pass
+
+def serve(host: str = "127.0.0.1", port: int = 8000, config: MockConfig = None) -> ThreadingHTTPServer:
+    config = config or MockConfig()
+    handler = type("ConfiguredMockChatHandler", (MockChatHandler,), {"config": config, "batch_store": MockBatchStore(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in for SMART evaluations")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=MOCK_LATENCY_S, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=MOCK_TOKENS_PER_S)
+    parser.add_argument("--error-rate", type=float, default=MOCK_ERROR_RATE, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=MOCK_RATE_LIMIT_RATE, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=MOCK_RETRY_AFTER_S)
+    parser.add_argument("--seed", type=int, default=MOCK_SEED)
+    parser.add_argument("--rpm-limit", type=int, default=MOCK_RPM_LIMIT, help="Simulated requests per minute quota")
+    parser.add_argument("--tpm-limit", type=int, default=MOCK_TPM_LIMIT, help="Simulated tokens per minute quota")
+    parser.add_argument("--batch-delay", type=float, default=MOCK_BATCH_DELAY_S, help="Seconds before a batch job completes")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, MockConfig(
+        args.latency, args.tokens_per_second, args.error_rate, args.rate_limit_rate, args.retry_after, args.seed,
+        args.rpm_limit, args.tpm_limit, args.batch_delay
+    ))
+    print(f"Mock LLM server listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
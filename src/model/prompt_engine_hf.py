@@ -1,17 +1,19 @@
 import os
 import re
+import asyncio
 from typing import List, Dict
 from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
-import pandas as pd
+
+from src.model.backends import LLMBackend, create_backend
+from src.model.engine import EvaluationEngine, MAX_CONCURRENCY
+from src.model.rule_engine import CRITERIA, RULE_PRESCREEN, criteria_to_evaluate
 
 # Load environment variables
 load_dotenv()
-HF_API_TOKEN = os.getenv("HF_API_TOKEN")
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", 5))
-
-# Initialize Hugging Face client
-client = InferenceClient(token=HF_API_TOKEN)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "huggingface")
+MODEL = "mistralai/Mistral-7B-Instruct-v0.3"
+TEMPERATURE = 0.2
+MAX_TOKENS = 2000
 
 # Build chat messages for Hugging Face API
 def build_messages(batch: List[Dict]) -> List[Dict]:
@@ -40,7 +42,10 @@ def build_messages(batch: List[Dict]) -> List[Dict]:
                 "- Si el objetivo ya es totalmente adecuado, responde exactamente: 'El objetivo es adecuado y no requiere mejoras.'\n"
                 "- Debes entregar siempre un 'Objetivo Mejorado' o indicar que no requiere mejoras. No entregues sugerencias sueltas.\n\n"
 
-                "FORMATO DE RESPUESTA (NO MODIFIQUES ESTO):\n\n"
+                "CRITERIOS YA VERIFICADOS:\n"
+                "- Si un objetivo incluye la línea 'Criterios a evaluar', responde ÚNICAMENTE las líneas de esos criterios, además de 'Código' y 'Objetivo Mejorado'. Los criterios omitidos ya fueron verificados como cumplidos.\n\n"
+
+                "FORMATO DE RESPUESTA (NO MODIFIQUES ESTO, salvo omitir los criterios ya verificados):\n\n"
                 "Código: [código de la materia]\n"
                 "S: [Sí / No / Parcialmente]. Explicación detallada con referencias textuales.\n"
                 "M: [Sí / No / Parcialmente]. Explicación detallada con referencias textuales.\n"
@@ -56,7 +61,12 @@ def build_messages(batch: List[Dict]) -> List[Dict]:
     for item in batch:
         codigo = item.get("Codigo Materia", "").strip()
         objetivo = item.get("Objetivo de la materia", "").strip()
-        content += f"Código: {codigo}\nObjetivo: {objetivo}\n\n"
+        content += f"Código: {codigo}\n"
+        # Criteria already settled by the rule pre-screening are left out
+        criterios = criteria_to_evaluate(item)
+        if len(criterios) < len(CRITERIA):
+            content += f"Criterios a evaluar: {', '.join(criterios)}\n"
+        content += f"Objetivo: {objetivo}\n\n"
 
     messages.append({
         "role": "user",
@@ -103,83 +113,18 @@ def parse_response(text: str) -> Dict[str, str]:
     return result
 
 # Process objectives, call API, and update dataframe
-def process_objectives_and_update_df(df, max_retries=5):
-    data = df.to_dict(orient='records')
-    total_records = len(data)
-    results = [None] * total_records
-
-    print(f"Total objectives to process: {total_records}")
-    print(f"Batch size: {BATCH_SIZE}")
-
-    pending_indices = list(range(total_records))
-    retry_tracker = {idx: 0 for idx in pending_indices}
-
-    while pending_indices:
-        current_batch_indices = pending_indices[:BATCH_SIZE]
-        batch = [data[idx] for idx in current_batch_indices]
-        messages = build_messages(batch)
-
-        print(f"\n--- NEW BATCH with {len(current_batch_indices)} objectives ---\n")
-        for msg in messages:
-            print(f"{msg['role'].upper()}:\n{msg['content']}\n")
-
-        # Call the API stream
-        stream = client.chat.completions.create(
-            model="mistralai/Mistral-7B-Instruct-v0.3",
-            messages=messages,
-            max_tokens=2000,
-            temperature=0.2,
-            stream=True,
-        )
-
-        response_parts = []
-        for chunk in stream:
-            if chunk.choices and chunk.choices[0].delta and hasattr(chunk.choices[0].delta, "content"):
-                content = chunk.choices[0].delta.content
-                if content:
-                    response_parts.append(content)
-
-        full_response = "".join(response_parts).strip()
-
-        print("\n--- Raw model response ---\n")
-        print(full_response)
-        print("\n--- End of raw response ---\n")
-
-        if full_response == "" or "Código:" not in full_response:
-            for idx in current_batch_indices:
-                retry_tracker[idx] += 1
-            print(f"Batch failed (empty or invalid response). Retrying individual items in next round...\n")
-        else:
-            splitted_responses = full_response.split("Código:")
-            print(f"Total response blocks found: {len(splitted_responses) - 1}")
-
-            parsed_batch_results = []
-            for block in splitted_responses[1:]:
-                response_text = "Código:" + block.strip()
-                parsed = parse_response(response_text)
-                parsed_batch_results.append(parsed)
-
-            for batch_idx, parsed_result in zip(current_batch_indices, parsed_batch_results):
-                results[batch_idx] = parsed_result
-
-        pending_indices = [
-            idx for idx in range(total_records)
-            if results[idx] is None or any(
-                results[idx].get(field, "").startswith("ERROR")
-                for field in ["S", "M", "A", "R", "T", "Objetivo Mejorado"]
-            )
-        ]
-
-        pending_indices = [
-            idx for idx in pending_indices
-            if retry_tracker[idx] < max_retries
-        ]
-
-        print(f"\nRemaining objectives to reprocess: {len(pending_indices)}")
-
-    for idx, parsed_result in enumerate(results):
-        for key in ["S", "M", "A", "R", "T", "Objetivo Mejorado"]:
-            df.at[idx, key] = parsed_result.get(key, "ERROR")
-
-    print("\nModel processing complete.\n")
-    return df
+def process_objectives_and_update_df(df, max_retries=5, save_path=None, max_concurrency=MAX_CONCURRENCY,
+                                     use_cache=True, resume=False, backend: LLMBackend = None,
+                                     use_rules=RULE_PRESCREEN):
+    engine = EvaluationEngine(
+        backend or create_backend(LLM_BACKEND, MODEL),
+        build_messages, parse_response, MAX_TOKENS, TEMPERATURE
+    )
+
+    async def run():
+        try:
+            return await engine.run(df, max_retries, save_path, max_concurrency, use_cache, resume, use_rules)
+        finally:
+            await engine.backend.aclose()
+
+    return asyncio.run(run())
@@ -1,20 +1,53 @@
 import os
 import re
+import asyncio
 from typing import List, Dict
 from dotenv import load_dotenv
-from openai import OpenAI
-import pandas as pd
+
+from src.model.backends import LLMBackend, create_backend
+from src.model.batch_job import BATCH_JOB_STATE_PATH, BatchJobEngine
+from src.model.checkpoint import CHECKPOINT_JOURNAL_PATH
+from src.model.engine import EvaluationEngine, MAX_CONCURRENCY
+from src.model.rule_engine import CRITERIA, RULE_PRESCREEN, criteria_to_evaluate
+from src.model.structured_output import json_response_format
+from src.model.telemetry import METRICS_PATH
 
 # Load environment variables
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", 5))
-
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+MODEL = "gpt-4o"
+TEMPERATURE = 0.3
+MAX_TOKENS = 4000
+# "json" asks for structured outputs when the backend supports a JSON schema, "text" keeps the block format
+RESPONSE_FORMAT = os.getenv("RESPONSE_FORMAT", "json").lower()
+
+# Free-text block format, parsed with parse_response
+TEXT_RESPONSE_FORMAT = (
+    "FORMATO DE RESPUESTA OBLIGATORIO (no modifiques ni omitas ningún campo, salvo los criterios ya verificados):\n"
+
+    "Código: código de la materia\n"
+    "S: Sí/No/Parcialmente. Explicación detallada y específica del motivo. [Debe indicar explícitamente al actor, por ejemplo 'el estudiante'.]\n"
+    "M: Sí/No/Parcialmente. Explicación detallada y específica del motivo.\n"
+    "A: Sí/No/Parcialmente. Explicación detallada y específica del motivo.\n"
+    "R: Sí/No/Parcialmente. Explicación detallada y específica del motivo.\n"
+    "T: Sí/No/Parcialmente. Explicación detallada y específica del motivo. [Expresiones como 'Al finalizar la asignatura' o similares son válidas.]\n"
+    "Objetivo Mejorado: (objetivo mejorado [Utilizar TODO el contenido del objetivo original, NO RESUMIR] o 'El objetivo es adecuado y no requiere mejoras.')\n"
+
+    "NO agregues introducción, conclusión ni explicaciones fuera del formato. NUNCA incluyas en SUGERENCIAS los CRITERIOS TEMPORAL ni ESPECÍFICO. ÚNICAMENTE INLCUIR SUGERENCIA SI LA MÉTRICA TIENE NO O PARCIALMENTE COMO RESULTADO, NUNCA PARA SÍ.\n"
+)
+
+# Structured outputs: the schema fixes the shape, the prompt only explains the fields
+JSON_RESPONSE_FORMAT = (
+    "FORMATO DE RESPUESTA OBLIGATORIO:\n"
+    "Responde con un objeto JSON cuya lista 'evaluaciones' tenga un elemento por cada código, en el mismo orden. Cada elemento contiene:\n"
+    "- 'Código': código de la materia.\n"
+    "- 'S', 'M', 'A', 'R' y 'T': un objeto con 'veredicto' (Sí, No o Parcialmente) y 'explicacion' (explicación detallada y específica del motivo). Los criterios ya verificados van como null.\n"
+    "- 'Objetivo Mejorado': el objetivo mejorado [Utilizar TODO el contenido del objetivo original, NO RESUMIR] con sus sugerencias, o 'El objetivo es adecuado y no requiere mejoras.'\n"
+    "NUNCA incluyas en SUGERENCIAS los CRITERIOS TEMPORAL ni ESPECÍFICO. ÚNICAMENTE INLCUIR SUGERENCIA SI LA MÉTRICA TIENE NO O PARCIALMENTE COMO RESULTADO, NUNCA PARA SÍ.\n"
+)
 
 # Build chat messages for OpenAI API
-def build_messages(batch: List[Dict]) -> List[Dict]:
+def build_messages(batch: List[Dict], response_format: str = RESPONSE_FORMAT) -> List[Dict]:
     messages = [
         {
             "role": "system",
@@ -55,17 +88,10 @@ def build_messages(batch: List[Dict]) -> List[Dict]:
                 "5. Si el objetivo ya es totalmente adecuado, responde exactamente: 'El objetivo es adecuado y no requiere mejoras.'\n"
                 "6. Siempre entrega un 'Objetivo Mejorado' o indica que no requiere mejoras. No entregues sugerencias sueltas.\n\n"
 
-                "FORMATO DE RESPUESTA OBLIGATORIO (no modifiques ni omitas ningún campo):\n"
-
-                "Código: código de la materia\n"
-                "S: Sí/No/Parcialmente. Explicación detallada y específica del motivo. [Debe indicar explícitamente al actor, por ejemplo 'el estudiante'.]\n"
-                "M: Sí/No/Parcialmente. Explicación detallada y específica del motivo.\n"
-                "A: Sí/No/Parcialmente. Explicación detallada y específica del motivo.\n"
-                "R: Sí/No/Parcialmente. Explicación detallada y específica del motivo.\n"
-                "T: Sí/No/Parcialmente. Explicación detallada y específica del motivo. [Expresiones como 'Al finalizar la asignatura' o similares son válidas.]\n"
-                "Objetivo Mejorado: (objetivo mejorado [Utilizar TODO el contenido del objetivo original, NO RESUMIR] o 'El objetivo es adecuado y no requiere mejoras.')\n"
+                "CRITERIOS YA VERIFICADOS:\n"
+                "- Si un objetivo incluye la línea 'Criterios a evaluar', responde ÚNICAMENTE las líneas de esos criterios, además de 'Código' y 'Objetivo Mejorado'. Los criterios omitidos ya fueron verificados como cumplidos: no los incluyas en la respuesta ni en las sugerencias.\n\n"
 
-                "NO agregues introducción, conclusión ni explicaciones fuera del formato. NUNCA incluyas en SUGERENCIAS los CRITERIOS TEMPORAL ni ESPECÍFICO. ÚNICAMENTE INLCUIR SUGERENCIA SI LA MÉTRICA TIENE NO O PARCIALMENTE COMO RESULTADO, NUNCA PARA SÍ.\n"
+                + (JSON_RESPONSE_FORMAT if response_format == "json" else TEXT_RESPONSE_FORMAT)
             )
         }
     ]
@@ -74,7 +100,12 @@ def build_messages(batch: List[Dict]) -> List[Dict]:
     for item in batch:
         codigo = item.get("Codigo Materia", "").strip()
         objetivo = item.get("Objetivo de la materia", "").strip()
-        content += f"Código: {codigo}\nObjetivo: {objetivo}\n\n"
+        content += f"Código: {codigo}\n"
+        # Criteria already settled by the rule pre-screening are left out
+        criterios = criteria_to_evaluate(item)
+        if len(criterios) < len(CRITERIA):
+            content += f"Criterios a evaluar: {', '.join(criterios)}\n"
+        content += f"Objetivo: {objetivo}\n\n"
 
     messages.append({
         "role": "user",
@@ -121,100 +152,26 @@ def parse_response(text: str) -> Dict[str, str]:
     return result
 
 # Process objectives, call API, and update dataframe
-def process_objectives_and_update_df(df, max_retries=5, save_path=None):
-    data = df.to_dict(orient='records')
-    total_records = len(data)
-    results = [None] * total_records
-
-    print(f"Total objectives to process: {total_records}")
-    print(f"Batch size: {BATCH_SIZE}")
-
-    pending_indices = list(range(total_records))
-    retry_tracker = {idx: 0 for idx in pending_indices}
-
-    while pending_indices:
-        current_batch_indices = pending_indices[:BATCH_SIZE]
-        batch = [data[idx] for idx in current_batch_indices]
-        messages = build_messages(batch)
-
-        print(f"\n--- NEW BATCH with {len(current_batch_indices)} objectives ---\n")
-        for msg in messages:
-            print(f"{msg['role'].upper()}:\n{msg['content']}\n")
-
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            max_tokens=4000,
-            temperature=0.3,
-            stream=True,
-        )
-
-        response_parts = []
-        for chunk in response:
-            if chunk.choices and chunk.choices[0].delta and hasattr(chunk.choices[0].delta, "content"):
-                content = chunk.choices[0].delta.content
-                if content:
-                    response_parts.append(content)
-
-        full_response = "".join(response_parts).strip()
-
-        print("\n--- Raw model response ---\n")
-        print(full_response)
-        print("\n--- End of raw response ---\n")
-
-        if full_response == "" or "Código:" not in full_response:
-            for idx in current_batch_indices:
-                retry_tracker[idx] += 1
-            print(f"Batch failed (empty or invalid response). Retrying individual items in next round...\n")
-        else:
-            splitted_responses = full_response.split("Código:")
-            print(f"Total response blocks found: {len(splitted_responses) - 1}")
-
-            parsed_batch_results = []
-            for block in splitted_responses[1:]:
-                response_text = "Código:" + block.strip()
-                parsed = parse_response(response_text)
-                parsed_batch_results.append(parsed)
-
-            for batch_idx, parsed_result in zip(current_batch_indices, parsed_batch_results):
-                results[batch_idx] = parsed_result
-
-        pending_indices = [
-            idx for idx in range(total_records)
-            if results[idx] is None or any(
-                results[idx].get(field, "").startswith("ERROR")
-                for field in ["S", "M", "A", "R", "T", "Objetivo Mejorado"]
-            )
-        ]
-
-        pending_indices = [
-            idx for idx in pending_indices
-            if retry_tracker[idx] < max_retries
-        ]
-
-        print(f"\nRemaining objectives to process: {len(pending_indices)}")
-
-        # Update DataFrame with current results after each batch
-        for idx, row in df.iterrows():
-            codigo = row["Codigo Materia"]
-            parsed_result = next(
-                (r for r in results if r and r.get("Código") == codigo), None
-            )
-            # Only update if all fields are not ERROR
-            if parsed_result and not any(
-                str(parsed_result.get(field, "")).startswith("ERROR")
-                for field in ["S", "M", "A", "R", "T", "Objetivo Mejorado"]
-            ):
-                for key in ["S", "M", "A", "R", "T", "Objetivo Mejorado"]:
-                    value = parsed_result.get(key, "")
-                    df.at[idx, key] = str(value)
-
-        # Save progress to CSV after each batch (only successful updates)
-        if save_path:
-            df.to_csv(save_path, index=False)
-            print(f"Progress saved to {save_path}")
-
-    print("\nModel processing complete.\n")
-    if 'Carrera Padre' in df.columns:
-        df = df.sort_values(by='Carrera Padre', ascending=True).reset_index(drop=True)
-    return df
+def process_objectives_and_update_df(df, max_retries=5, save_path=None, max_concurrency=MAX_CONCURRENCY,
+                                     use_cache=True, resume=False, backend: LLMBackend = None,
+                                     use_rules=RULE_PRESCREEN, bulk=False, checkpoint_path=CHECKPOINT_JOURNAL_PATH,
+                                     metrics_path=METRICS_PATH, batch_state_path=BATCH_JOB_STATE_PATH):
+    backend = backend or create_backend(LLM_BACKEND, MODEL)
+    # Structured outputs need a backend that takes a JSON schema, the others fall back to the regex parser
+    response_format = RESPONSE_FORMAT if backend.supports_response_format else "text"
+    # Bulk mode submits one Batch API job instead of streaming each batch
+    engine_class = BatchJobEngine if bulk else EvaluationEngine
+    engine = engine_class(
+        backend, lambda batch: build_messages(batch, response_format), parse_response, MAX_TOKENS, TEMPERATURE,
+        response_format=json_response_format() if response_format == "json" else None,
+        **({"state_path": batch_state_path} if bulk else {})
+    )
+
+    async def run():
+        try:
+            return await engine.run(df, max_retries, save_path, max_concurrency, use_cache, resume, use_rules,
+                                    checkpoint_path=checkpoint_path, metrics_path=metrics_path)
+        finally:
+            await engine.backend.aclose()
+
+    return asyncio.run(run())
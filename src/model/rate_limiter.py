@@ -0,0 +1,206 @@
+import os
+import re
+import time
+import random
+import asyncio
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+from src.model.backends import BackendError
+
+# Load environment variables
+load_dotenv()
+RATE_LIMIT_RPM = float(os.getenv("RATE_LIMIT_RPM", 0))
+RATE_LIMIT_TPM = float(os.getenv("RATE_LIMIT_TPM", 0))
+TRANSIENT_RETRIES = int(os.getenv("TRANSIENT_RETRIES", 6))
+BACKOFF_BASE_S = float(os.getenv("BACKOFF_BASE_S", 1.0))
+BACKOFF_MAX_S = float(os.getenv("BACKOFF_MAX_S", 60.0))
+
+# Statuses worth sending again unchanged; anything else goes back to the engine
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+# "6m0s", "1.5s" or "20ms" as used by the x-ratelimit-reset-* headers
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+def parse_rate_limit_headers(headers: Optional[Dict[str, str]]) -> Dict[str, float]:
+    if not headers:
+        return {}
+    headers = {key.lower(): value for key, value in headers.items()}
+    parsed = {}
+    for kind in ("requests", "tokens"):
+        for field in ("limit", "remaining"):
+            value = headers.get(f"x-ratelimit-{field}-{kind}")
+            if value is not None:
+                try:
+                    parsed[f"{field}_{kind}"] = float(value)
+                except ValueError:
+                    pass
+        reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+        if reset is not None:
+            parsed[f"reset_{kind}_s"] = reset
+    return parsed
+
+# Refills continuously at per_minute / 60 per second, up to one minute of budget.
+# A limit of 0 disables the bucket.
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # Seconds until amount can be taken; requests larger than the bucket wait for a full one
+    def delay(self, amount: float) -> float:
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        amount = min(amount, self.capacity)
+        if self.tokens < amount:
+            wait = max(wait, (amount - self.tokens) / self.rate)
+        return wait
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+    # Give back (or charge) the difference between the estimate and the real usage
+    def adjust(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    # Follow the server's view of the quota when it reports one. A disabled bucket
+    # adopts the limit the server announces, so pacing works without configuration.
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_s: Optional[float]) -> None:
+        if not self.enabled and limit:
+            self.capacity = limit
+            self.rate = limit / 60
+            self.tokens = limit
+        if not self.enabled or remaining is None:
+            return
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+        if remaining <= 0 and reset_s:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + reset_s)
+
+# Paces requests against the account's RPM and TPM limits and retries transient
+# failures (429, 5xx, connection errors) with exponential backoff and full jitter.
+# A Retry-After hint pauses every request, not only the one that was rejected.
+class RateLimitScheduler:
+    def __init__(self, rpm: float = RATE_LIMIT_RPM, tpm: float = RATE_LIMIT_TPM,
+                 max_retries: int = TRANSIENT_RETRIES, backoff_base_s: float = BACKOFF_BASE_S,
+                 backoff_max_s: float = BACKOFF_MAX_S, seed: Optional[int] = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.random = random.Random(seed)
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.counters = {
+            "rpm_wait_s": 0.0,
+            "tpm_wait_s": 0.0,
+            "pause_wait_s": 0.0,
+            "backoff_wait_s": 0.0,
+            "rate_limited_responses": 0,
+            "transient_retries": 0,
+        }
+
+    # Wait until both buckets allow one request of the estimated size, first come first served
+    async def acquire(self, estimated_tokens: int) -> None:
+        async with self.lock:
+            while True:
+                waits = {
+                    "pause_wait_s": max(0.0, self.paused_until - time.monotonic()),
+                    "rpm_wait_s": self.requests.delay(1),
+                    "tpm_wait_s": self.tokens.delay(estimated_tokens),
+                }
+                reason = max(waits, key=waits.get)
+                if waits[reason] <= 0:
+                    break
+                await asyncio.sleep(waits[reason])
+                self.counters[reason] += waits[reason]
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        if actual_tokens:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def update_from_headers(self, headers: Optional[Dict[str, str]]) -> None:
+        limits = parse_rate_limit_headers(headers)
+        self.requests.sync(limits.get("limit_requests"), limits.get("remaining_requests"), limits.get("reset_requests_s"))
+        self.tokens.sync(limits.get("limit_tokens"), limits.get("remaining_tokens"), limits.get("reset_tokens_s"))
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = self.random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt))
+        if retry_after is not None:
+            # The server knows best, jitter only spreads the retries after it
+            delay = retry_after + self.random.uniform(0, self.backoff_base_s)
+        return delay
+
+    # Open a stream through the limiter. Only failures before the first chunk are
+    # retried here, a stream that breaks halfway is left to the engine's re-queueing.
+    # Returns the stream and its first chunk (None if it was empty).
+    async def open_stream(self, open_stream: Callable[[], AsyncIterator], estimated_tokens: int,
+                          on_attempt: Optional[Callable[[], None]] = None) -> Tuple[AsyncIterator, object]:
+        attempt = 0
+        while True:
+            await self.acquire(estimated_tokens)
+            if on_attempt is not None:
+                on_attempt()
+            stream = open_stream()
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+            except Exception as e:
+                await stream.aclose()
+                # Errors without a status (timeouts, dropped connections) are transient too,
+                # but only when the backend reported them, not for programming errors
+                status = e.status_code if isinstance(e, BackendError) else None
+                transient = isinstance(e, BackendError) and (status is None or status in RETRYABLE_STATUSES)
+                if not transient or attempt >= self.max_retries:
+                    raise
+
+                self.update_from_headers(e.headers)
+                delay = self.backoff_delay(attempt, e.retry_after)
+                if status == 429:
+                    self.counters["rate_limited_responses"] += 1
+                    self.paused_until = max(self.paused_until, time.monotonic() + delay)
+                self.counters["transient_retries"] += 1
+                self.counters["backoff_wait_s"] += delay
+                print(f"Request failed with {status or e.__class__.__name__}, retrying in {delay:.1f}s "
+                      f"(attempt {attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def stats(self) -> Dict[str, float]:
+        stats = {key: round(value, 3) if isinstance(value, float) else value for key, value in self.counters.items()}
+        stats["throttled_s"] = round(stats["rpm_wait_s"] + stats["tpm_wait_s"] + stats["pause_wait_s"], 3)
+        return stats
@@ -0,0 +1,53 @@
+from typing import List, Dict, Iterable, Optional
+import pandas as pd
+
+RESULT_FIELDS = ["S", "M", "A", "R", "T", "Objetivo Mejorado"]
+
+# Course codes as the model echoes them back may carry markdown or stray spaces
+def normalize_code(code) -> str:
+    return str(code).strip().strip("*").strip()
+
+def is_complete(parsed_result: Dict[str, str]) -> bool:
+    return not any(
+        str(parsed_result.get(field, "")).startswith("ERROR")
+        for field in RESULT_FIELDS
+    )
+
+# Parsed evaluations keyed by Codigo Materia, matched by the returned Código
+class ResultStore:
+    def __init__(self, codes: Iterable[str]):
+        self.codes = list(dict.fromkeys(normalize_code(code) for code in codes))
+        self.expected = set(self.codes)
+        self.results: Dict[str, Dict[str, str]] = {}
+
+    # Keep a complete block for a known code, returns the stored code or None
+    def add(self, parsed_result: Dict[str, str]) -> Optional[str]:
+        code = normalize_code(parsed_result.get("Código", ""))
+        if code not in self.expected or not is_complete(parsed_result):
+            return None
+        self.results[code] = {**parsed_result, "Código": code}
+        return code
+
+    def get(self, code: str) -> Optional[Dict[str, str]]:
+        return self.results.get(normalize_code(code))
+
+    def missing(self) -> List[str]:
+        return [code for code in self.codes if code not in self.results]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    # Write every stored result into its rows with one aligned assignment
+    def merge_into(self, df: pd.DataFrame) -> pd.DataFrame:
+        if not self.results:
+            return df
+        for field in RESULT_FIELDS:
+            if field not in df.columns:
+                df[field] = None
+            df[field] = df[field].astype(object)
+
+        results_df = pd.DataFrame.from_dict(self.results, orient="index")[RESULT_FIELDS]
+        aligned = results_df.reindex(df["Codigo Materia"].map(normalize_code))
+        found = aligned["S"].notna().to_numpy()
+        df.loc[found, RESULT_FIELDS] = aligned.to_numpy()[found]
+        return df
@@ -0,0 +1,70 @@
+import os
+from typing import List, Dict
+from dotenv import load_dotenv
+import pandas as pd
+
+# Load environment variables
+load_dotenv()
+RULE_PRESCREEN = os.getenv("RULE_PRESCREEN", "true").lower() in ("1", "true", "yes")
+
+CRITERIA = ["S", "M", "A", "R", "T"]
+RULES_COLUMN = "Criterios por reglas"
+CRITERIA_TO_EVALUATE = "Criterios a evaluar"
+
+# Explicit actor named in the objective, e.g. 'el estudiante' or 'los alumnos'
+ACTOR_PATTERN = r"\b(?:el|la|los|las|cada)\s+(?:estudiantes?|alumnos?|alumnas?|participantes?|egresad[oa]s?)\b|\bel/la\s+estudiante\b"
+# Explicit time frame tied to the course, e.g. 'Al finalizar la asignatura'
+TEMPORAL_PATTERN = (
+    r"\bal\s+(?:finalizar|terminar|concluir|culminar|t[ée]rmino\s+de|final\s+de|cabo\s+de)\s+"
+    r"(?:la|el|este|esta)?\s*(?:asignatura|materia|curso|semestre|m[óo]dulo|gesti[óo]n)\b"
+)
+# Shorter objectives cannot be judged safely by rules
+MIN_WORDS = 8
+
+RULE_VERDICTS = {
+    "S": "Sí. Verificado por reglas: el objetivo indica explícitamente quién realiza la acción.",
+    "T": "Sí. Verificado por reglas: el objetivo incluye un marco temporal explícito como 'Al finalizar la asignatura'.",
+}
+
+# Settle the mechanical criteria for the whole DataFrame at once.
+# Returns, per row, the criteria settled by rules, their verdicts and the
+# criteria still left to the model. Objectives that match no rule or are too
+# short to judge are marked for the full path (every criterion goes to the model).
+def prescreen(df: pd.DataFrame) -> pd.DataFrame:
+    objectives = df["Objetivo de la materia"].fillna("").astype(str)
+    has_actor = objectives.str.contains(ACTOR_PATTERN, case=False, regex=True)
+    has_time_frame = objectives.str.contains(TEMPORAL_PATTERN, case=False, regex=True)
+    long_enough = objectives.str.split().str.len() >= MIN_WORDS
+
+    full_path = ~long_enough | ~(has_actor | has_time_frame)
+    settled_s = has_actor & ~full_path
+    settled_t = has_time_frame & ~full_path
+
+    screened = pd.DataFrame(index=df.index)
+    screened["S"] = settled_s.map({True: RULE_VERDICTS["S"], False: None})
+    screened["T"] = settled_t.map({True: RULE_VERDICTS["T"], False: None})
+    screened[RULES_COLUMN] = (
+        settled_s.map({True: "S", False: ""}) + settled_t.map({True: "T", False: ""})
+    ).str.join(", ")
+    screened[CRITERIA_TO_EVALUATE] = (
+        pd.Series("MAR", index=df.index)
+        .radd(settled_s.map({True: "", False: "S"}))
+        .add(settled_t.map({True: "", False: "T"}))
+        .str.join(", ")
+    )
+    screened["Ruta completa"] = full_path
+    return screened
+
+# Verdicts settled by rules for one screened row
+def rule_verdicts(screened_row: Dict) -> Dict[str, str]:
+    return {
+        criterion: screened_row[criterion]
+        for criterion in ("S", "T")
+        if isinstance(screened_row.get(criterion), str)
+    }
+
+def criteria_to_evaluate(item: Dict) -> List[str]:
+    value = item.get(CRITERIA_TO_EVALUATE)
+    if not isinstance(value, str) or not value:
+        return CRITERIA
+    return [criterion.strip() for criterion in value.split(",") if criterion.strip()]
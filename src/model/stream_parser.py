@@ -0,0 +1,151 @@
+import json
+from typing import Callable, Dict
+
+BLOCK_MARKER = "Código:"
+
+# Incrementally splits a streamed response into "Código:" blocks and parses each
+# one as soon as the next block starts, so results are available before the
+# stream ends. The stream should be aborted once feed() returns False.
+class StreamingResponseParser:
+    def __init__(self,
+                 parse: Callable[[str], Dict[str, str]],
+                 on_block: Callable[[Dict[str, str]], bool],
+                 max_preamble_chars: int = 300,
+                 max_bad_blocks: int = 1):
+        self.parse = parse
+        self.on_block = on_block
+        self.max_preamble_chars = max_preamble_chars
+        self.max_bad_blocks = max_bad_blocks
+        self.buffer = ""
+        self.scan_from = 0
+        self.in_block = False
+        self.blocks = 0
+        self.bad_blocks = 0
+        self.aborted = False
+        self.closed = False
+
+    def _emit(self, block: str) -> None:
+        parsed = self.parse(block.strip())
+        self.blocks += 1
+        if not self.on_block(parsed):
+            self.bad_blocks += 1
+            if self.bad_blocks > self.max_bad_blocks:
+                self.aborted = True
+
+    # Add a chunk of streamed text, returns False when the output left the format
+    def feed(self, chunk: str) -> bool:
+        if self.aborted or self.closed:
+            return not self.aborted
+        self.buffer += chunk
+
+        # Slice blocks out by offset and trim the buffer once, so a large chunk
+        # holding many blocks is still split in linear time
+        start = 0
+        while not self.aborted:
+            pos = self.buffer.find(BLOCK_MARKER, self.scan_from)
+            if pos == -1:
+                break
+            if self.in_block:
+                self._emit(self.buffer[start:pos])
+            self.in_block = True
+            start = pos
+            self.scan_from = pos + len(BLOCK_MARKER)
+
+        self.buffer = self.buffer[start:]
+        # The marker may be split across chunks, rescan its tail next time
+        self.scan_from = max(len(BLOCK_MARKER) if self.in_block else 0,
+                             len(self.buffer) - len(BLOCK_MARKER) + 1)
+
+        if not self.in_block and len(self.buffer) > self.max_preamble_chars:
+            self.aborted = True
+        return not self.aborted
+
+    # Parse the last block once the stream has ended. A stream cut off at the token
+    # limit ends mid-block, flush=False drops that block instead of committing it.
+    def close(self, flush: bool = True) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.in_block and not self.aborted and flush:
+            self._emit(self.buffer)
+        self.buffer = ""
+
+# Structured (JSON) counterpart of StreamingResponseParser: decodes the objects of
+# the first array in the response, e.g. {"evaluaciones": [{...}, {...}]}, one at a
+# time as soon as each closes. Same feed/close contract, parse receives the object.
+class StreamingJsonParser:
+    def __init__(self,
+                 parse: Callable[[object], Dict[str, str]],
+                 on_block: Callable[[Dict[str, str]], bool],
+                 max_preamble_chars: int = 300,
+                 max_bad_blocks: int = 1):
+        self.parse = parse
+        self.on_block = on_block
+        self.max_preamble_chars = max_preamble_chars
+        self.max_bad_blocks = max_bad_blocks
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.in_array = False
+        self.finished = False
+        self.blocks = 0
+        self.bad_blocks = 0
+        self.aborted = False
+        self.closed = False
+
+    def _emit(self, item) -> None:
+        parsed = self.parse(item)
+        self.blocks += 1
+        if not self.on_block(parsed):
+            self.bad_blocks += 1
+            if self.bad_blocks > self.max_bad_blocks:
+                self.aborted = True
+
+    def _decode_items(self) -> None:
+        position = 0
+        while not self.aborted:
+            while position < len(self.buffer) and self.buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(self.buffer):
+                break
+            if self.buffer[position] == "]":
+                self.finished = True
+                break
+            try:
+                item, position = self.decoder.raw_decode(self.buffer, position)
+            except json.JSONDecodeError:
+                # The object is still incomplete
+                break
+            self._emit(item)
+        self.buffer = self.buffer[position:]
+
+    def feed(self, chunk: str) -> bool:
+        if self.aborted or self.closed or self.finished:
+            return not self.aborted
+        self.buffer += chunk
+
+        if not self.in_array:
+            start = self.buffer.find("[")
+            if start == -1:
+                if len(self.buffer) > self.max_preamble_chars:
+                    self.aborted = True
+                return not self.aborted
+            self.in_array = True
+            self.buffer = self.buffer[start + 1:]
+            self._decode_items()
+        elif "}" in chunk:
+            # An object can only be complete once a closing brace arrived
+            self._decode_items()
+        return not self.aborted
+
+    # An object cut off by the end of the stream counts as a bad block; with
+    # flush=False nothing left in the buffer is decoded
+    def close(self, flush: bool = True) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        if self.in_array and not self.finished and not self.aborted:
+            if flush:
+                self._decode_items()
+            if self.buffer.strip() and not self.finished:
+                self.bad_blocks += 1
+        self.buffer = ""
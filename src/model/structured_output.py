@@ -0,0 +1,63 @@
+from typing import Dict
+
+from src.model.rule_engine import CRITERIA
+
+VERDICTS = ["Sí", "Parcialmente", "No"]
+EVALUATIONS_KEY = "evaluaciones"
+NO_IMPROVEMENT = "El objetivo es adecuado y no requiere mejoras."
+
+# One object per Código with a verdict and explanation per criterion. Criteria
+# already settled by the rule pre-screening are answered with null.
+def evaluation_schema() -> Dict:
+    criterion = {
+        "anyOf": [
+            {
+                "type": "object",
+                "properties": {
+                    "veredicto": {"type": "string", "enum": VERDICTS},
+                    "explicacion": {"type": "string"},
+                },
+                "required": ["veredicto", "explicacion"],
+                "additionalProperties": False,
+            },
+            {"type": "null"},
+        ]
+    }
+    evaluation = {
+        "type": "object",
+        "properties": {
+            "Código": {"type": "string"},
+            **{name: criterion for name in CRITERIA},
+            "Objetivo Mejorado": {"type": "string"},
+        },
+        "required": ["Código", *CRITERIA, "Objetivo Mejorado"],
+        "additionalProperties": False,
+    }
+    return {
+        "type": "object",
+        "properties": {EVALUATIONS_KEY: {"type": "array", "items": evaluation}},
+        "required": [EVALUATIONS_KEY],
+        "additionalProperties": False,
+    }
+
+# response_format for OpenAI-compatible chat completions (structured outputs)
+def json_response_format() -> Dict:
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "smart_evaluations", "strict": True, "schema": evaluation_schema()},
+    }
+
+# One decoded evaluation object in the same shape parse_response returns for a text block
+def parse_evaluation(evaluation) -> Dict[str, str]:
+    if not isinstance(evaluation, dict):
+        return {"Código": "ERROR"}
+    result = {"Código": str(evaluation.get("Código") or "ERROR").strip()}
+    for name in CRITERIA:
+        value = evaluation.get(name)
+        if isinstance(value, dict) and value.get("veredicto") in VERDICTS:
+            result[name] = f"{value['veredicto']}. {str(value.get('explicacion') or '').strip()}"
+        else:
+            result[name] = "ERROR: no evaluado."
+    improved = str(evaluation.get("Objetivo Mejorado") or "").strip()
+    result["Objetivo Mejorado"] = improved or NO_IMPROVEMENT
+    return result
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+from typing import List, Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+METRICS_PATH = os.getenv("METRICS_PATH", "./data/metrics.jsonl")
+
+# Timing and usage of a single model request
+class RequestTrace:
+    def __init__(self, objectives: int, attempt: int = 0, response_format: str = "text"):
+        self.objectives = objectives
+        self.attempt = attempt
+        self.response_format = response_format
+        self.started = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.parsed = 0
+        self.truncated = False
+        self.error: Optional[str] = None
+
+    # Restart the clock once the request actually leaves the queue
+    def start(self) -> None:
+        self.started = time.perf_counter()
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    # Read token counts from an OpenAI-style usage object, if the backend sent one
+    def set_usage(self, usage) -> None:
+        if usage is None:
+            return
+        self.prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+    def finish(self, parsed: int, truncated: bool = False, error: Optional[str] = None) -> None:
+        self.finished = time.perf_counter()
+        self.parsed = parsed
+        self.truncated = truncated
+        self.error = error
+
+    def to_record(self) -> Dict:
+        finished = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            "timestamp": time.time(),
+            "objectives": self.objectives,
+            "attempt": self.attempt,
+            "response_format": self.response_format,
+            "ttft_s": round(self.first_token - self.started, 4) if self.first_token is not None else None,
+            "latency_s": round(finished - self.started, 4),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "parsed": self.parsed,
+            "parse_success_rate": round(self.parsed / self.objectives, 4) if self.objectives else 0.0,
+            "truncated": self.truncated,
+            "error": self.error,
+        }
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (rank - low), 4)
+
+# Appends one JSONL record per request and summarizes the run at the end
+class MetricsRecorder:
+    def __init__(self, path: str = METRICS_PATH, scheduler=None):
+        self.path = path
+        # Rate limiter whose throttling counters are added to the summary
+        self.scheduler = scheduler
+        self.records: List[Dict] = []
+        self.started = time.perf_counter()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, trace: RequestTrace) -> None:
+        record = trace.to_record()
+        self.records.append(record)
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def summary(self) -> Dict:
+        wall_time = time.perf_counter() - self.started
+        latencies = [r["latency_s"] for r in self.records]
+        ttfts = [r["ttft_s"] for r in self.records if r["ttft_s"] is not None]
+        sent = sum(r["objectives"] for r in self.records)
+        parsed = sum(r["parsed"] for r in self.records)
+        completion_tokens = sum(r["completion_tokens"] for r in self.records)
+        summary = {
+            "type": "summary",
+            "requests": len(self.records),
+            "retried_requests": sum(1 for r in self.records if r["attempt"] > 0),
+            "failed_requests": sum(1 for r in self.records if r["error"]),
+            "truncated_requests": sum(1 for r in self.records if r["truncated"]),
+            "objectives_sent": sent,
+            "objectives_parsed": parsed,
+            "parse_success_rate": round(parsed / sent, 4) if sent else 0.0,
+            "prompt_tokens": sum(r["prompt_tokens"] for r in self.records),
+            "completion_tokens": completion_tokens,
+            "cached_tokens": sum(r["cached_tokens"] for r in self.records),
+            "latency_p50_s": percentile(latencies, 0.5),
+            "latency_p90_s": percentile(latencies, 0.9),
+            "latency_p99_s": percentile(latencies, 0.99),
+            "ttft_p50_s": percentile(ttfts, 0.5),
+            "ttft_p90_s": percentile(ttfts, 0.9),
+            "ttft_p99_s": percentile(ttfts, 0.99),
+            "wall_time_s": round(wall_time, 4),
+            "objectives_per_s": round(parsed / wall_time, 4) if wall_time > 0 else 0.0,
+            "completion_tokens_per_s": round(completion_tokens / wall_time, 4) if wall_time > 0 else 0.0,
+        }
+        summary["parse_failure_rate_by_format"] = self.parse_failure_rates()
+        if self.scheduler is not None:
+            summary.update(self.scheduler.stats())
+        return summary
+
+    # Share of objectives in answered requests that could not be parsed, per response
+    # format; requests that failed before answering are not parse failures
+    def parse_failure_rates(self) -> Dict[str, float]:
+        answered = {}
+        for r in self.records:
+            if r["error"]:
+                continue
+            sent, parsed = answered.get(r.get("response_format", "text"), (0, 0))
+            answered[r.get("response_format", "text")] = (sent + r["objectives"], parsed + r["parsed"])
+        return {
+            response_format: round(1 - parsed / sent, 4) if sent else 0.0
+            for response_format, (sent, parsed) in answered.items()
+        }
+
+    # Append the run summary to the metrics file and print it
+    def close(self) -> Dict:
+        summary = self.summary()
+        self.file.write(json.dumps(summary, ensure_ascii=False) + "\n")
+        self.file.close()
+        print(
+            f"Requests: {summary['requests']} ({summary['retried_requests']} retries, "
+            f"{summary['failed_requests']} failed) | parse success: {summary['parse_success_rate']:.1%} | "
+            f"latency p50/p90/p99: {summary['latency_p50_s']}/{summary['latency_p90_s']}/{summary['latency_p99_s']} s | "
+            f"throughput: {summary['objectives_per_s']} objectives/s"
+        )
+        if summary["parse_failure_rate_by_format"]:
+            print("Parse failures: " + ", ".join(
+                f"{response_format} {rate:.1%}" for response_format, rate in summary["parse_failure_rate_by_format"].items()
+            ))
+        if self.scheduler is not None:
+            print(
+                f"Throttled: {summary['throttled_s']} s (rpm {summary['rpm_wait_s']} s, tpm {summary['tpm_wait_s']} s, "
+                f"retry-after pauses {summary['pause_wait_s']} s) | backoff: {summary['backoff_wait_s']} s over "
+                f"{summary['transient_retries']} retries | 429 responses: {summary['rate_limited_responses']}"
+            )
+        print(f"Metrics saved to {self.path}")
+        return summary
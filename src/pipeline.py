@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import inspect
+from typing import Callable, Dict, List, Optional
+from dotenv import load_dotenv
+import pandas as pd
+
+from src.data.storage import load_frame
+
+# Load environment variables
+load_dotenv()
+PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", "./data/pipeline_state.json")
+
+# Content hash of files, in the given order; missing files hash as empty
+def file_fingerprint(paths: List[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.encode("utf-8"))
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    return digest.hexdigest()[:16]
+
+# Fingerprint of the source of the given modules, so editing a stage's code reruns it
+def code_fingerprint(*modules) -> str:
+    source = "".join(inspect.getsource(module) for module in modules)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+# One step of the pipeline. inputs are upstream stage names, outputs the files it
+# writes, params any setting that changes its result. run receives the pipeline and
+# may return the files it actually wrote when they are not known upfront.
+# Volatile stages read from outside the pipeline and always run.
+class Stage:
+    def __init__(self, name: str, run: Callable, inputs: List[str] = None, outputs: List[str] = None,
+                 params: Dict = None, volatile: bool = False):
+        self.name = name
+        self.run = run
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+        self.params = params or {}
+        self.volatile = volatile
+
+# Runs stages in declaration order, skipping those whose upstream output fingerprints
+# and params match the last successful run recorded in the state file
+class Pipeline:
+    def __init__(self, stages: List[Stage], state_path: str = PIPELINE_STATE_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self.state = self._load_state()
+        self.frames: Dict[str, pd.DataFrame] = {}
+
+    def _load_state(self) -> Dict:
+        if not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A corrupt state file only means every stage runs again
+            return {}
+
+    def _save_state(self) -> None:
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temporary, self.state_path)
+
+    # DataFrame produced by an upstream stage, from memory or from its first output file
+    def frame(self, name: str) -> pd.DataFrame:
+        if name not in self.frames:
+            self.frames[name] = load_frame(self.stages[name].outputs[0])
+        return self.frames[name]
+
+    def input_fingerprint(self, stage: Stage) -> str:
+        payload = {
+            "params": stage.params,
+            "inputs": {name: self.state[name]["output"] for name in stage.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+    def is_up_to_date(self, stage: Stage, fingerprint: str) -> bool:
+        recorded = self.state.get(stage.name)
+        if stage.volatile or recorded is None or recorded.get("input") != fingerprint:
+            return False
+        return all(os.path.exists(path) for path in recorded.get("outputs", []))
+
+    # selected limits the run to those stages, which always run; their upstream
+    # stages must have completed in an earlier run. force reruns everything.
+    def run(self, selected: Optional[List[str]] = None, force: bool = False) -> Dict[str, str]:
+        outcome = {}
+        for name, stage in self.stages.items():
+            if selected and name not in selected:
+                continue
+            missing = [upstream for upstream in stage.inputs if upstream not in self.state]
+            if missing:
+                raise RuntimeError(f"Stage '{name}' needs the output of {', '.join(missing)}, run it first")
+
+            fingerprint = self.input_fingerprint(stage)
+            if not force and not selected and self.is_up_to_date(stage, fingerprint):
+                print(f"[{name}] up to date, skipped")
+                outcome[name] = "skipped"
+                continue
+
+            print(f"[{name}] running...")
+            start = time.perf_counter()
+            outputs = stage.run(self) or stage.outputs
+            self.state[name] = {
+                "input": fingerprint,
+                "output": file_fingerprint(outputs),
+                "outputs": outputs,
+                "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "duration_s": round(time.perf_counter() - start, 3),
+            }
+            self._save_state()
+            outcome[name] = "ran"
+        return outcome
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+
+from src.model.backends import OpenAIBackend
+from src.model.batch_job import BatchJobEngine
+from src.model.batch_packer import pack_batches
+from src.model.mock_llm import CHARS_PER_TOKEN, MockConfig, render_mock_response, serve
+from src.model.prompt_engine_openai import TEMPERATURE, build_messages, parse_response
+from src.model.result_store import normalize_code
+from src.model.structured_output import json_response_format
+from test_engine import catalogue, make_engine, mock_backend
+
+# The mock's files/batches stand-in, with jobs finishing shortly after they are created
+@pytest.fixture
+def batch_server():
+    server = serve(port=0, config=MockConfig(latency_s=0, tokens_per_s=0, batch_delay_s=0.1))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def submitted_batches(server) -> dict:
+    return server.RequestHandlerClass.batch_store.batches
+
+def make_batch_engine(server, state_path, response_format: str = "text", max_tokens: int = 4000) -> BatchJobEngine:
+    backend = OpenAIBackend("gpt-4o", api_key="x", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+    return BatchJobEngine(
+        backend, lambda batch: build_messages(batch, response_format), parse_response, max_tokens, TEMPERATURE,
+        response_format=json_response_format() if response_format == "json" else None,
+        state_path=str(state_path), poll_interval_s=0.05,
+    )
+
+def streamed(df: pd.DataFrame, response_format: str = "text") -> pd.DataFrame:
+    return asyncio.run(make_engine(mock_backend(), response_format).run(df.copy(), use_cache=False, use_rules=False))
+
+# Submit a job for the whole catalogue and leave it in the state file, as an interrupted run would
+def submit_only(engine: BatchJobEngine, df: pd.DataFrame) -> dict:
+    items_by_code = {normalize_code(item["Codigo Materia"]): item for item in df.to_dict(orient="records")}
+    batches = pack_batches(list(items_by_code), items_by_code, output_budget=engine.output_budget)
+    return asyncio.run(engine.submit(batches, items_by_code, 0))
+
+@pytest.mark.parametrize("response_format", ["text", "json"])
+def test_bulk_run_submits_polls_and_collects_every_code(batch_server, tmp_path, monkeypatch, response_format):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    state_path = tmp_path / "batch_job.json"
+    engine = make_batch_engine(batch_server, state_path, response_format)
+    result = asyncio.run(engine.run(df.copy(), use_cache=False, use_rules=False))
+
+    assert len(submitted_batches(batch_server)) == 1
+    assert not state_path.exists()
+    pd.testing.assert_frame_equal(result, streamed(df, response_format))
+
+def test_truncated_bulk_requests_go_into_a_follow_up_job(batch_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    full = render_mock_response(build_messages(df.to_dict(orient="records")[:3], "text"))
+    engine = make_batch_engine(batch_server, tmp_path / "batch_job.json", max_tokens=len(full) // CHARS_PER_TOKEN)
+    engine.output_budget = 10 ** 6
+    result = asyncio.run(engine.run(df.copy(), use_cache=False, use_rules=False))
+
+    assert len(submitted_batches(batch_server)) > 1
+    pd.testing.assert_frame_equal(result, streamed(df))
+
+def test_bulk_run_resumes_the_job_in_the_state_file(batch_server, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    state_path = tmp_path / "batch_job.json"
+    job = submit_only(make_batch_engine(batch_server, state_path), df)
+    assert state_path.exists()
+
+    result = asyncio.run(make_batch_engine(batch_server, state_path).run(df.copy(), use_cache=False, use_rules=False))
+    assert f"Resuming batch job {job['batch_id']}" in capsys.readouterr().out
+    assert list(submitted_batches(batch_server)) == [job["batch_id"]]
+    assert not state_path.exists()
+    pd.testing.assert_frame_equal(result, streamed(df))
+
+def test_bulk_run_discards_a_job_with_other_settings(batch_server, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    state_path = tmp_path / "batch_job.json"
+    job = submit_only(make_batch_engine(batch_server, state_path, "text"), df)
+
+    result = asyncio.run(make_batch_engine(batch_server, state_path, "json").run(df.copy(), use_cache=False, use_rules=False))
+    assert f"Discarding batch job {job['batch_id']}" in capsys.readouterr().out
+    assert len(submitted_batches(batch_server)) == 2
+    pd.testing.assert_frame_equal(result, streamed(df, "json"))
@@ -0,0 +1,170 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+from src.model.batch_packer import OUTPUT_TOKEN_BUDGET, bisect_batch, estimate_output_tokens, pack_batches
+from src.model.engine import EvaluationEngine
+from src.model.mock_llm import CHARS_PER_TOKEN, MockBackend, MockConfig, render_mock_response
+from src.model.prompt_engine_openai import TEMPERATURE, build_messages, parse_response
+from src.model.result_store import ResultStore
+from src.model.structured_output import json_response_format
+from src.model.telemetry import RequestTrace
+
+def course(number: int) -> dict:
+    return {
+        "Carrera Padre": f"Carrera {number % 3}",
+        "Carreras Hijos": "Ninguna",
+        "Codigo Materia": f"MAT-{number:06d}",
+        "Nombre Materia": f"Materia {number}",
+        "Electiva": "No",
+        "Objetivo de la materia": f"Analizar los procesos y modelos de datos del caso {number} con métodos formales",
+    }
+
+def catalogue(size: int) -> pd.DataFrame:
+    return pd.DataFrame([course(number) for number in range(size)])
+
+def make_engine(backend, response_format: str = "text", max_tokens: int = 4000) -> EvaluationEngine:
+    return EvaluationEngine(
+        backend, lambda batch: build_messages(batch, response_format), parse_response, max_tokens, TEMPERATURE,
+        response_format=json_response_format() if response_format == "json" else None,
+    )
+
+def mock_backend(**config) -> MockBackend:
+    return MockBackend(config=MockConfig(**{"latency_s": 0, "tokens_per_s": 0, **config}))
+
+@pytest.mark.parametrize("response_format", ["text", "json"])
+def test_truncated_stream_keeps_the_cut_off_code_missing(response_format):
+    items = [course(number) for number in range(5)]
+    codes = [item["Codigo Materia"] for item in items]
+    full = render_mock_response(build_messages(items, response_format), response_format == "json")
+    # Stop the answer in the middle of the last course's improved objective
+    cut = full.rindex("Objetivo Mejorado") + 40
+    engine = make_engine(mock_backend(), response_format, max_tokens=cut // CHARS_PER_TOKEN)
+
+    store = ResultStore(codes)
+    completed = []
+    parser = engine.response_parser(codes, store, {}, completed)
+
+    async def run():
+        return await engine.evaluate_batch(items, asyncio.Semaphore(1), parser, RequestTrace(len(items)))
+
+    _, truncated = asyncio.run(run())
+    assert truncated
+    assert completed == codes[:4]
+    assert store.get(codes[4]) is None
+
+def test_truncated_batches_are_bisected_until_every_code_is_complete(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    expected = asyncio.run(make_engine(mock_backend()).run(df.copy(), use_cache=False, use_rules=False))
+
+    # Room for about three evaluations per answer, so packed batches get cut off
+    full = render_mock_response(build_messages(df.to_dict(orient="records")[:3], "text"))
+    backend = mock_backend()
+    engine = make_engine(backend, max_tokens=len(full) // CHARS_PER_TOKEN)
+    # Pack everything into one request, as if the packer had underestimated the answers
+    engine.output_budget = 10 ** 6
+    result = asyncio.run(engine.run(df.copy(), use_cache=False, use_rules=False))
+
+    assert backend.requests > 1
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_output_budget_follows_max_tokens():
+    assert make_engine(mock_backend(), max_tokens=4000).output_budget == min(OUTPUT_TOKEN_BUDGET, 3200)
+    engine = make_engine(mock_backend(), max_tokens=2000)
+    assert engine.output_budget == min(OUTPUT_TOKEN_BUDGET, 1600)
+
+    items_by_code = {item["Codigo Materia"]: item for item in (course(number) for number in range(60))}
+    for batch in pack_batches(list(items_by_code), items_by_code, output_budget=engine.output_budget):
+        assert len(batch) == 1 or sum(estimate_output_tokens(items_by_code[code]) for code in batch) <= engine.output_budget
+
+def test_mock_backends_never_share_the_real_model_name():
+    from src.model.backends import create_backend
+    assert create_backend("mock", "gpt-4o").model != "gpt-4o"
+    assert MockBackend().model == "mock"
+
+def test_mock_answers_are_not_served_to_the_real_model(tmp_path, monkeypatch):
+    from src.model.backends import create_backend
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(6)
+    mock = create_backend("mock", "gpt-4o")
+    mock.config = MockConfig(latency_s=0, tokens_per_s=0)
+    asyncio.run(make_engine(mock).run(df.copy(), use_rules=False))
+
+    real = mock_backend()
+    real.model = "gpt-4o"
+    asyncio.run(make_engine(real).run(df.copy(), use_rules=False))
+    assert real.requests == mock.requests
+
+def test_rule_screened_evaluations_are_not_served_without_rules(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(6)
+    df["Objetivo de la materia"] = "Al finalizar la asignatura, el estudiante será capaz de " + df["Objetivo de la materia"]
+    screened = asyncio.run(make_engine(mock_backend()).run(df.copy(), use_rules=True))
+    assert screened["S"].str.contains("reglas").all()
+
+    backend = mock_backend()
+    result = asyncio.run(make_engine(backend).run(df.copy(), use_rules=False))
+    assert backend.requests > 0
+    assert not result["S"].str.contains("reglas").any()
+
+def test_cached_rerun_sends_no_requests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    first = asyncio.run(make_engine(mock_backend()).run(df.copy(), use_rules=False))
+
+    backend = mock_backend()
+    second = asyncio.run(make_engine(backend).run(df.copy(), use_rules=False))
+    assert backend.requests == 0
+    pd.testing.assert_frame_equal(second, first)
+
+def test_resume_only_sends_codes_missing_from_the_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = catalogue(8)
+    journal = tmp_path / "checkpoint.jsonl"
+    expected = asyncio.run(make_engine(mock_backend()).run(df.copy(), use_cache=False, use_rules=False,
+                                                           checkpoint_path=str(journal)))
+
+    backend = mock_backend()
+    asyncio.run(make_engine(backend).run(df.copy(), use_cache=False, use_rules=False, resume=True,
+                                         checkpoint_path=str(journal)))
+    assert backend.requests == 0
+
+    # Keep three journaled results and a torn fourth line, as a crash would leave them
+    lines = journal.read_text(encoding="utf-8").splitlines(keepends=True)
+    journal.write_text("".join(lines[:3]) + lines[3][:20], encoding="utf-8")
+    backend = mock_backend()
+    result = asyncio.run(make_engine(backend).run(df.copy(), use_cache=False, use_rules=False, resume=True,
+                                                  checkpoint_path=str(journal)))
+    assert backend.requests > 0
+    pd.testing.assert_frame_equal(result, expected)
+
+def test_format_drift_aborts_the_stream_and_keeps_the_earlier_blocks():
+    items = [course(number) for number in range(5)]
+    codes = [item["Codigo Materia"] for item in items]
+    text = render_mock_response(build_messages(items, "text"))
+    # The third and fourth blocks answer for courses that were not asked
+    text = text.replace(codes[2], "OTRA-000002").replace(codes[3], "OTRA-000003")
+    store = ResultStore(codes)
+    completed = []
+    parser = make_engine(mock_backend()).response_parser(codes, store, {}, completed)
+
+    assert not parser.feed(text)
+    assert parser.aborted
+    parser.close()
+    assert completed == codes[:2]
+    assert store.missing() == codes[2:]
+
+def test_result_store_keeps_only_complete_blocks_of_the_batch():
+    store = ResultStore(["MAT-000001", " **MAT-000002** "])
+    block = {field: "Sí." for field in ["S", "M", "A", "R", "T", "Objetivo Mejorado"]}
+    assert store.add({**block, "Código": "**MAT-000002**"}) == "MAT-000002"
+    assert store.add({**block, "Código": "MAT-000009"}) is None
+    assert store.add({**block, "Código": "MAT-000001", "T": "ERROR: no evaluado."}) is None
+    assert store.missing() == ["MAT-000001"]
+
+def test_bisect_batch_splits_in_halves_down_to_single_codes():
+    assert bisect_batch(["a", "b", "c", "d", "e"]) == [["a", "b"], ["c", "d", "e"]]
+    assert bisect_batch(["a"]) == [["a"]]
+    assert bisect_batch([]) == []
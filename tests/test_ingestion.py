@@ -0,0 +1,66 @@
+import json
+import threading
+
+import pytest
+
+from src.data.ingestion import fetch_records, snapshot_meta_path
+from src.data.mock_endpoint import serve
+
+RECORDS = [
+    {"codigo_materia": f"MAT-{number:06d}", "nombre_materia": f"Materia {number}", "electiva": "No",
+     "objectivo_materias": f"Objetivo {number} con acentos: evaluación, diseño", "carrera_servicio": "",
+     "carrera": f"Carrera {number % 4}"}
+    for number in range(500)
+]
+
+@pytest.fixture
+def endpoint():
+    servers = []
+
+    def start(**options):
+        server = serve(RECORDS, port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/api?access-token=local", server.state
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+def test_conditional_fetch_reuses_the_snapshot(endpoint, tmp_path):
+    url, state = endpoint()
+    snapshot = str(tmp_path / "raw.json")
+
+    assert fetch_records(url, snapshot) == RECORDS
+    assert state.full_responses == 1
+    with open(snapshot, "r", encoding="utf-8") as f:
+        assert json.load(f) == RECORDS
+
+    # ETag: If-None-Match
+    assert fetch_records(url, snapshot) == RECORDS
+    assert (state.full_responses, state.not_modified) == (1, 1)
+
+    # Last-Modified alone: If-Modified-Since
+    meta_path = snapshot_meta_path(snapshot)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({**meta, "etag": None}, f)
+    assert fetch_records(url, snapshot) == RECORDS
+    assert (state.full_responses, state.not_modified) == (1, 2)
+
+    # New data on the endpoint no longer matches the ETag and is downloaded again
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    state.set_records(RECORDS[:10])
+    assert fetch_records(url, snapshot) == RECORDS[:10]
+    assert state.full_responses == 2
+
+@pytest.mark.parametrize("status, retry_after_s", [(429, 0.5), (503, 0)])
+def test_fetch_retries_rate_limits_and_unavailable_answers(endpoint, tmp_path, status, retry_after_s):
+    url, state = endpoint(fail_first=1, failure_status=status, retry_after_s=retry_after_s)
+
+    assert fetch_records(url, str(tmp_path / "raw.json")) == RECORDS
+    assert state.requests == 2
+    assert state.full_responses == 1
@@ -0,0 +1,90 @@
+import random
+from typing import List, Dict
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from src.data.preprocessor import json_to_df
+
+# json_to_df as it was before the groupby rewrite, kept as the reference output
+def legacy_json_to_df(data: List[Dict]) -> pd.DataFrame:
+    column_map = {
+        'carrera_servicio': 'Carrera Padre',
+        'carrera': 'Carreras Hijos',
+        'codigo_materia': 'Codigo Materia',
+        'nombre_materia': 'Nombre Materia',
+        'electiva': 'Electiva',
+        'objectivo_materias': 'Objetivo de la materia'
+    }
+    df = pd.DataFrame(data).rename(columns=column_map)
+
+    parent_map = {}
+    for _, row in df.iterrows():
+        code = row['Codigo Materia']
+        if not row['Carrera Padre'] or row['Carrera Padre'].strip() == "":
+            parent_map[code] = row['Carreras Hijos'].strip()
+
+    result_rows = []
+    for code, real_parent in parent_map.items():
+        course_rows = df[df['Codigo Materia'] == code]
+
+        children_set = set()
+        for _, row in course_rows.iterrows():
+            child = row['Carreras Hijos'].strip()
+            if child != real_parent and child not in ["", "Ninguna"]:
+                children_set.add(child)
+
+        first_row = course_rows.iloc[0]
+        result_rows.append({
+            'Carrera Padre': real_parent,
+            'Carreras Hijos': '\n'.join(sorted(children_set)) if children_set else 'Ninguna',
+            'Codigo Materia': code,
+            'Nombre Materia': first_row['Nombre Materia'],
+            'Electiva': first_row['Electiva'],
+            'Objetivo de la materia': first_row['Objetivo de la materia']
+        })
+
+    return pd.DataFrame(result_rows)
+
+# Endpoint-shaped dump with the awkward cases of the real one: several parent rows
+# per code, codes without a parent row, blank or padded careers, "Ninguna" children,
+# children equal to the parent and rows of a code spread over the whole dump
+def synthetic_dump(rows: int, codes: int, seed: int = 7) -> List[Dict]:
+    rng = random.Random(seed)
+    careers = [f"Carrera {number}" for number in range(60)]
+    records = []
+    for number in range(rows):
+        code = f"MAT-{rng.randrange(codes):06d}"
+        parent_row = rng.random() < 0.2
+        records.append({
+            'codigo_materia': code,
+            'nombre_materia': f"Materia {code[-4:]} v{rng.randrange(3)}",
+            'electiva': rng.choice(["Sí", "No"]),
+            'objectivo_materias': f"Objetivo {number} de {code}",
+            'carrera_servicio': rng.choice(["", " ", "  "]) if parent_row else rng.choice(careers),
+            'carrera': rng.choice(careers + ["", "Ninguna", " Carrera 1 ", "Carrera 2 "]),
+        })
+    return records
+
+def test_json_to_df_matches_legacy_on_large_dump():
+    data = synthetic_dump(rows=100_000, codes=1_000)
+    expected = legacy_json_to_df(data)
+    assert len(expected) > 900
+    assert_frame_equal(json_to_df(data).reset_index(drop=True), expected)
+
+def test_json_to_df_matches_legacy_on_edge_cases():
+    data = [
+        {'codigo_materia': 'A', 'nombre_materia': 'A1', 'electiva': 'No', 'objectivo_materias': 'oa',
+         'carrera_servicio': 'Carrera 2', 'carrera': 'Carrera 3'},
+        {'codigo_materia': 'A', 'nombre_materia': 'A2', 'electiva': 'No', 'objectivo_materias': 'ob',
+         'carrera_servicio': '', 'carrera': ' Carrera 1 '},
+        {'codigo_materia': 'A', 'nombre_materia': 'A3', 'electiva': 'No', 'objectivo_materias': 'oc',
+         'carrera_servicio': 'Carrera 1', 'carrera': 'Carrera 1'},
+        {'codigo_materia': 'B', 'nombre_materia': 'B1', 'electiva': 'Sí', 'objectivo_materias': 'od',
+         'carrera_servicio': 'Carrera 4', 'carrera': 'Carrera 5'},
+        {'codigo_materia': 'C', 'nombre_materia': 'C1', 'electiva': 'Sí', 'objectivo_materias': 'oe',
+         'carrera_servicio': ' ', 'carrera': 'Carrera 6'},
+        {'codigo_materia': 'C', 'nombre_materia': 'C2', 'electiva': 'Sí', 'objectivo_materias': 'of',
+         'carrera_servicio': 'Carrera 6', 'carrera': 'Ninguna'},
+    ]
+    assert_frame_equal(json_to_df(data).reset_index(drop=True), legacy_json_to_df(data))